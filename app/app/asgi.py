@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+# Async views run their queries on a thread pool, where persistent
+# connections are never closed at the end of a request and pile up.
+# Overrides the value of env files shared with the WSGI workers.
+os.environ["DB_CONN_MAX_AGE"] = "0"
 
 application = get_asgi_application()
+
+for alias, database in settings.DATABASES.items():
+    if database.get("CONN_MAX_AGE"):
+        raise ImproperlyConfigured(
+            f"CONN_MAX_AGE of database {alias!r} must be 0 under ASGI."
+        )
@@ -1,6 +1,8 @@
 import os
+import time
 
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
@@ -20,3 +22,34 @@ app.autodiscover_tasks()
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
+
+
+# Task runtime metrics. The worker's main process serves the samples of
+# all pool processes on CELERY_METRICS_PORT for Prometheus to scrape.
+_task_started = {}
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    from prometheus_client import start_http_server
+
+    from common.metrics import get_registry
+
+    port = int(os.getenv("CELERY_METRICS_PORT", "9808"))
+    start_http_server(port, registry=get_registry())
+
+
+@task_prerun.connect
+def task_started(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    from common.metrics import CELERY_TASK_RUNTIME
+
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_RUNTIME.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
@@ -11,8 +11,12 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -54,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -95,6 +100,31 @@ DATABASES = {
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+        # Keep connections open between requests instead of paying the
+        # TCP and auth handshakes every time; 0 restores per-request
+        # connections. Health checks drop connections the server closed.
+        # Under ASGI persistent connections leak, so asgi.py forces 0.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+        ),
+        "OPTIONS": {
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+        },
+    },
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": (
+            f"redis://{os.getenv('REDIS_HOST', 'localhost')}"
+            f":{os.getenv('REDIS_PORT', '6379')}/1"
+        ),
+        "KEY_PREFIX": "br",
     },
 }
 
@@ -116,6 +146,49 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+# PASSWORD_HASHER picks the algorithm for new hashes, the others stay
+# listed so existing hashes still verify. A hash made with another
+# algorithm or other parameters is rehashed on the next successful login.
+# Run `python manage.py calibrate_password_hashers` to pick the costs.
+
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2_sha256")
+
+_PASSWORD_HASHERS = {
+    "argon2": "users.hashers.Argon2PasswordHasher",
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "pbkdf2_sha256": "users.hashers.PBKDF2PasswordHasher",
+}
+
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(
+        f"Unknown PASSWORD_HASHER {PASSWORD_HASHER!r}, use one of: "
+        f"{', '.join(_PASSWORD_HASHERS)}."
+    )
+
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.pop(PASSWORD_HASHER),
+    *_PASSWORD_HASHERS.values(),
+]
+
+PASSWORD_HASHER_PARAMS = {
+    "pbkdf2_sha256": {
+        "iterations": int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "720000")),
+    },
+    "argon2": {
+        "time_cost": int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2")),
+        # KiB
+        "memory_cost": int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", "102400")),
+        "parallelism": int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "8")),
+    },
+    "scrypt": {
+        "work_factor": int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", "16384")),
+        "block_size": int(os.getenv("PASSWORD_SCRYPT_BLOCK_SIZE", "8")),
+        "parallelism": int(os.getenv("PASSWORD_SCRYPT_PARALLELISM", "1")),
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -147,8 +220,64 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
+    # Token buckets of common.throttling: N requests of burst, refilled
+    # at N per period. Keyed "<view throttle_scope>:<user|ip>".
+    "DEFAULT_THROTTLE_RATES": {
+        "token:ip": os.getenv("THROTTLE_TOKEN_IP", "60/min"),
+        "register:ip": os.getenv("THROTTLE_REGISTER_IP", "30/min"),
+        "rentals-create:user": os.getenv(
+            "THROTTLE_RENTALS_CREATE_USER", "60/min"
+        ),
+    },
+    # Proxies in front of the app (nginx in compose), so client IPs come
+    # from the entry the last proxy added to X-Forwarded-For and not from
+    # entries the client can forge. 0 uses REMOTE_ADDR.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
 }
 
+THROTTLE_REDIS_URL = CACHES["default"]["LOCATION"]
+THROTTLE_REDIS_TIMEOUT = float(os.getenv("THROTTLE_REDIS_TIMEOUT", "0.1"))
+
 AUTH_USER_MODEL = "users.User"
+
+# Rentals still open after this long are closed by the overdue sweep.
+RENTAL_OVERDUE_AFTER = timedelta(
+    hours=int(os.getenv("RENTAL_OVERDUE_HOURS", "24"))
+)
+
+# Rental events outbox, relayed to a Redis stream for downstream
+# consumers (one consumer group each).
+RENTAL_EVENTS_REDIS_URL = os.getenv(
+    "RENTAL_EVENTS_REDIS_URL",
+    f"redis://{os.getenv('REDIS_HOST', 'localhost')}"
+    f":{os.getenv('REDIS_PORT', '6379')}/2",
+)
+RENTAL_EVENTS_STREAM = os.getenv("RENTAL_EVENTS_STREAM", "rentals:events")
+RENTAL_EVENTS_STREAM_MAXLEN = int(
+    os.getenv("RENTAL_EVENTS_STREAM_MAXLEN", "1000000")
+)
+RENTAL_EVENTS_CONSUMER_GROUPS = [
+    group
+    for group in os.getenv(
+        "RENTAL_EVENTS_CONSUMER_GROUPS", "billing,fleet-ops,dashboards"
+    ).split(",")
+    if group
+]
+RENTAL_EVENTS_RELAY_INTERVAL = float(
+    os.getenv("RENTAL_EVENTS_RELAY_SECONDS", "5")
+)
+
+CELERY_BEAT_SCHEDULE = {
+    "sweep-overdue-rentals": {
+        "task": "rentals.tasks.sweep_overdue_rentals",
+        "schedule": crontab(minute="*/15"),
+    },
+    "relay-rental-events": {
+        "task": "rentals.tasks.relay_rental_events_task",
+        "schedule": RENTAL_EVENTS_RELAY_INTERVAL,
+        # Runs missed while the workers are busy are not worth queuing.
+        "options": {"expires": RENTAL_EVENTS_RELAY_INTERVAL},
+    },
+}
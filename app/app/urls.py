@@ -19,10 +19,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
+from common.schema import get_schema_view
+from common.views import metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Bicycle rental API",
@@ -32,23 +34,23 @@ schema_view = get_schema_view(
         contact=openapi.Contact(email="vybornoff@outlook.com"),
         license=openapi.License(name="MIT License"),
     ),
-    public=True,
     permission_classes=(permissions.AllowAny,),
 )
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
     path("api/v1/users/", include("users.urls")),
     path("api/v1/bicycles/", include("bicycles.urls")),
     path("api/v1/rentals/", include("rentals.urls")),
     path(
         '',
-        schema_view.with_ui('swagger', cache_timeout=0),
+        schema_view.with_ui('swagger'),
         name='schema-swagger-ui',
     ),
     path(
         'redoc/',
-        schema_view.with_ui('redoc', cache_timeout=0),
+        schema_view.with_ui('redoc'),
         name='schema-redoc',
     ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,75 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from common.metrics import record_cache
+
+AVAILABLE_TIMEOUT = 60
+AVAILABLE_VERSION_KEY = 'bicycles:available:version'
+AVAILABLE_HITS_KEY = 'bicycles:available:hits'
+AVAILABLE_MISSES_KEY = 'bicycles:available:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def available_version():
+    """
+    Current generation of the available-bicycles list.
+
+    A missing version is seeded from the clock rather than restarting
+    at 1, so pages cached under an older generation are never reused.
+    """
+    version = cache.get(AVAILABLE_VERSION_KEY)
+    if version is None:
+        cache.add(AVAILABLE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(AVAILABLE_VERSION_KEY)
+    return version
+
+
+def available_page_key(url):
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'bicycles:available:{available_version()}:{digest}'
+
+
+def get_available_page(key):
+    data = cache.get(key)
+    _incr(AVAILABLE_MISSES_KEY if data is None else AVAILABLE_HITS_KEY)
+    record_cache('available_bicycles', data is not None)
+    return data
+
+
+def set_available_page(key, data):
+    cache.set(key, data, AVAILABLE_TIMEOUT)
+
+
+def invalidate_available():
+    """
+    Drop every cached page of the available-bicycles list.
+
+    Bumping the version makes all page keys unreachable at once; the
+    stale pages expire on their own after ``AVAILABLE_TIMEOUT``.
+    """
+    try:
+        cache.incr(AVAILABLE_VERSION_KEY)
+    except ValueError:
+        cache.add(AVAILABLE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def available_stats():
+    counters = cache.get_many([AVAILABLE_HITS_KEY, AVAILABLE_MISSES_KEY])
+    hits = counters.get(AVAILABLE_HITS_KEY, 0)
+    misses = counters.get(AVAILABLE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else None,
+    }
@@ -0,0 +1,64 @@
+from django.db import models, transaction
+from django.utils import timezone
+
+from bicycles.cache import invalidate_available
+
+
+class BicycleQuerySet(models.QuerySet):
+    def claim(self, pk):
+        """
+        Atomically mark an available bicycle as rented.
+
+        The check and the write happen in a single conditional UPDATE,
+        so of several concurrent callers only one can succeed.
+
+        :param pk: primary key of the bicycle
+        :return: True if the bicycle was claimed by this call
+        """
+        claimed = bool(
+            self.filter(pk=pk, in_rent=False).update(
+                in_rent=True, updated_at=timezone.now()
+            )
+        )
+        if claimed:
+            transaction.on_commit(invalidate_available)
+        return claimed
+
+    def set_in_rent(self, in_rent):
+        """
+        Bulk-change the rent status of the selected bicycles.
+
+        Unlike a bare ``update`` this keeps ``updated_at`` and the
+        available-bicycles cache in step with the change.
+
+        :param in_rent: new rent status
+        :return: number of updated rows
+        """
+        updated = self.update(in_rent=in_rent, updated_at=timezone.now())
+        if updated:
+            transaction.on_commit(invalidate_available)
+        return updated
+
+    def search(self, query=None, min_price=None, max_price=None):
+        """
+        Filter by a case-insensitive model substring and a price range.
+
+        ``model__icontains`` compiles to ``UPPER(model) LIKE ...``, which
+        the ``bicycle_model_trgm_idx`` trigram index serves on Postgres
+        with pg_trgm, for the API and the admin search alike.
+
+        :param query: substring of the model name
+        :param min_price: lowest price, inclusive
+        :param max_price: highest price, inclusive
+        """
+        queryset = self
+        if query:
+            queryset = queryset.filter(model__icontains=query)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        return queryset
+
+
+BicycleManager = models.Manager.from_queryset(BicycleQuerySet)
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0002_alter_bicycle_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bicycle',
+            index=models.Index(
+                condition=models.Q(('in_rent', False)),
+                fields=['-added_at', '-id'],
+                name='bicycle_available_idx',
+            ),
+        ),
+    ]
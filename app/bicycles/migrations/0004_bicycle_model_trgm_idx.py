@@ -0,0 +1,45 @@
+from django.db import migrations
+
+INDEX_NAME = 'bicycle_model_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    # The index needs the pg_trgm contrib extension. Without it the
+    # model search still works, just as a sequential scan.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    table = apps.get_model('bicycles', 'Bicycle')._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Same expression as the icontains lookup, so the planner matches it.
+    # CONCURRENTLY keeps the table writable while the index is built.
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON {table} '
+        f'USING gin (UPPER(model) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}'
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('bicycles', '0003_bicycle_bicycle_available_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
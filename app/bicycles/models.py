@@ -2,6 +2,7 @@ from decimal import Decimal
 
 from django.core.validators import MinValueValidator
 from django.db import models
+from bicycles.managers import BicycleManager
 from common.models import BaseModel
 
 
@@ -14,5 +15,16 @@ class Bicycle(BaseModel):
     )
     in_rent = models.BooleanField(default=False)
 
+    objects = BicycleManager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['-added_at', '-id'],
+                condition=models.Q(in_rent=False),
+                name='bicycle_available_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.model} id{self.id}"
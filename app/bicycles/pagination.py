@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AvailableBicyclesPagination(CursorPagination):
+    # Keyset pagination matching the partial index on available
+    # bicycles, so deep pages cost the same as the first one.
+    ordering = ('-added_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
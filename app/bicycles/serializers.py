@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from bicycles.models import Bicycle
 
@@ -6,3 +8,37 @@ class BicycleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bicycle
         fields = ('id', 'model', 'price', 'in_rent')
+
+
+class BicycleSearchSerializer(serializers.Serializer):
+    """
+    Query parameters of the bicycle search.
+    """
+
+    # Shorter substrings have no trigram to look up in the index.
+    q = serializers.CharField(required=False, min_length=3, max_length=100)
+    min_price = serializers.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        min_value=Decimal('0'),
+        required=False,
+    )
+    max_price = serializers.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        min_value=Decimal('0'),
+        required=False,
+    )
+
+    def validate(self, attrs):
+        min_price = attrs.get('min_price')
+        max_price = attrs.get('max_price')
+        if (
+            min_price is not None
+            and max_price is not None
+            and min_price > max_price
+        ):
+            raise serializers.ValidationError(
+                {'min_price': 'Must not be greater than max_price.'}
+            )
+        return attrs
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bicycles.cache import invalidate_available
+from bicycles.models import Bicycle
+
+
+@receiver(post_save, sender=Bicycle)
+@receiver(post_delete, sender=Bicycle)
+def invalidate_available_bicycles(sender, **kwargs):
+    transaction.on_commit(invalidate_available)
@@ -1,15 +1,20 @@
 from decimal import Decimal
+from unittest import skipUnless
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
 from django.contrib.auth.models import Permission
 from django.contrib.admin.sites import AdminSite
+from django.db import connection
 from django.test import TestCase, RequestFactory
 from django.urls import reverse
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from bicycles.admin import BicycleAdmin
+from bicycles.cache import available_stats
 
 from bicycles.models import Bicycle
 from bicycles.serializers import BicycleSerializer
@@ -128,6 +133,7 @@ class BicycleAdminTestCase(TestCase):
 class AvailableBicyclesListAPIViewTestCase(TestCase):
     def setUp(self):
         # Set up test data
+        cache.clear()
         self.user = User.objects.create_superuser(
             email='admin@example.com', password='testpass123'
         )
@@ -151,6 +157,241 @@ class AvailableBicyclesListAPIViewTestCase(TestCase):
         self.assertIn(self.bicycle1.model.encode(), response.content)
         self.assertNotIn(self.bicycle2.model.encode(), response.content)
 
+    def test_available_bicycles_cursor_pagination(self):
+        # Test that pages follow each other without gaps or repeats
+        self.client.force_authenticate(user=self.user)
+        bicycles = [self.bicycle1] + [
+            Bicycle.objects.create(model=f'City Bike {i}', price='99.99')
+            for i in range(4)
+        ]
+        expected_ids = [
+            bicycle.id
+            for bicycle in sorted(
+                bicycles, key=lambda b: (b.added_at, b.id), reverse=True
+            )
+        ]
+
+        ids = []
+        url = self.url + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_available_bicycles_cache_hit(self):
+        # Test that a repeated request is served from the cache
+        self.client.force_authenticate(user=self.user)
+
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.bicycle1.model.encode(), response.content)
+        stats = available_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_available_bicycles_cache_invalidated_on_rent(self):
+        # Test that renting a bicycle drops it from the cached list
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('rental-create'),
+                {'bicycle': self.bicycle1.id},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(self.url)
+        self.assertNotIn(self.bicycle1.model.encode(), response.content)
+
+    def test_available_bicycles_cache_invalidated_by_admin(self):
+        # Test that the admin actions drop stale pages
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.url)
+
+        admin_instance = BicycleAdmin(Bicycle, AdminSite())
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_instance.mark_as_available(
+                None, Bicycle.objects.filter(id=self.bicycle2.id)
+            )
+
+        response = self.client.get(self.url)
+        self.assertIn(self.bicycle2.model.encode(), response.content)
+
+    def test_available_bicycles_not_modified(self):
+        # Test that an unchanged list is answered with 304 and no queries
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(
+            self.url + '?page_size=1', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bicycle2.in_rent = False
+            self.bicycle2.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(self.bicycle2.model.encode(), response.content)
+
+    def test_cache_stats_admin_only(self):
+        # Test that cache counters are exposed to staff only
+        url = reverse('available-bicycles-cache-stats')
+        regular_user = User.objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+
+        self.client.force_authenticate(user=regular_user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_ratio'})
+
+
+class BicycleSearchAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Bicycle.objects.create(model='Mountain Bike', price='599.99')
+        Bicycle.objects.create(model='Mountain Pro', price='999.99')
+        Bicycle.objects.create(model='Road Bike', price='799.99')
+        Bicycle.objects.create(
+            model='Mountain Kid', price='99.99', in_rent=True
+        )
+        self.url = reverse('available-bicycles-search')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row['model'] for row in response.data['results'])
+
+    def test_model_substring(self):
+        # Case-insensitive, in the middle of the name, available only
+        self.assertEqual(
+            self.search(q='OUNTAIN'), ['Mountain Bike', 'Mountain Pro']
+        )
+        self.assertEqual(self.search(q='bike'), ['Mountain Bike', 'Road Bike'])
+
+    def test_price_range(self):
+        self.assertEqual(
+            self.search(min_price='600', max_price='999.99'),
+            ['Mountain Pro', 'Road Bike'],
+        )
+        self.assertEqual(
+            self.search(q='mountain', max_price='600'), ['Mountain Bike']
+        )
+
+    def test_invalid_params(self):
+        for params in (
+            {'q': 'ab'},
+            {'min_price': 'cheap'},
+            {'min_price': '10', 'max_price': '5'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', password='testpass123'
+        )
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:bicycles_bicycle_changelist'), {'q': 'ountain'}
+        )
+
+        self.assertContains(response, 'Mountain Kid')
+        self.assertNotContains(response, 'Road Bike')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_trigram_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm is not available')
+            constraints = connection.introspection.get_constraints(
+                cursor, Bicycle._meta.db_table
+            )
+        self.assertEqual(constraints['bicycle_model_trgm_idx']['type'], 'gin')
+
+
+class AvailableBicyclesAsyncViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.bicycles = [
+            Bicycle.objects.create(model=f'City Bike {i}', price='99.99')
+            for i in range(5)
+        ]
+        Bicycle.objects.create(
+            model='Rented Bike', price='99.99', in_rent=True
+        )
+        self.url = reverse('available-bicycles-list-async')
+
+    def test_available_bicycles_async_pagination(self):
+        # Test that async pages match the sync ordering
+        expected_ids = [
+            bicycle.id
+            for bicycle in sorted(
+                self.bicycles, key=lambda b: (b.added_at, b.id), reverse=True
+            )
+        ]
+
+        ids = []
+        url = self.url + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_available_bicycles_async_unauthenticated(self):
+        # Test that the async view requires a token
+        self.client.credentials()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', response.json())
+
+    def test_available_bicycles_async_invalid_cursor(self):
+        # Test that a forged cursor is rejected
+        response = self.client.get(self.url, {'cursor': 'bogus'})
+
+        self.assertEqual(response.status_code, 400)
+
 
 class BicycleSerializerTestCase(TestCase):
     def setUp(self):
@@ -1,5 +1,10 @@
 from django.urls import path
-from bicycles.views import AvailableBicyclesListAPIView
+from bicycles.views import (
+    AvailableBicyclesCacheStatsAPIView,
+    AvailableBicyclesListAPIView,
+    BicycleSearchAPIView,
+    available_bicycles_async,
+)
 
 urlpatterns = [
     path(
@@ -7,4 +12,19 @@ urlpatterns = [
         AvailableBicyclesListAPIView.as_view(),
         name='available-bicycles-list',
     ),
+    path(
+        'available/async/',
+        available_bicycles_async,
+        name='available-bicycles-list-async',
+    ),
+    path(
+        'available/search/',
+        BicycleSearchAPIView.as_view(),
+        name='available-bicycles-search',
+    ),
+    path(
+        'available/cache-stats/',
+        AvailableBicyclesCacheStatsAPIView.as_view(),
+        name='available-bicycles-cache-stats',
+    ),
 ]
@@ -1,11 +1,119 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from bicycles.cache import (
+    available_page_key,
+    available_stats,
+    available_version,
+    get_available_page,
+    set_available_page,
+)
 from bicycles.models import Bicycle
-from bicycles.serializers import BicycleSerializer
+from bicycles.pagination import AvailableBicyclesPagination
+from bicycles.serializers import (
+    BicycleSearchSerializer,
+    BicycleSerializer,
+)
+from common import keyset
+from common.conditional import ConditionalListMixin
+from users.authentication import async_jwt_required
 
 
-class AvailableBicyclesListAPIView(generics.ListAPIView):
+class AvailableBicyclesListAPIView(ConditionalListMixin, generics.ListAPIView):
+    """
+    Available bicycles, newest first.
+
+    Pages carry an ETag from the version of the page cache and are
+    answered with 304 while no bicycle has changed.
+    """
+
     queryset = Bicycle.objects.filter(in_rent=False)
     serializer_class = BicycleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AvailableBicyclesPagination
+
+    def get_list_version(self, request):
+        return available_version()
+
+    def list(self, request, *args, **kwargs):
+        # Pages are shared by all users, keyed by the full URL so the
+        # cursor links inside them stay valid.
+        key = available_page_key(request.build_absolute_uri())
+        data = get_available_page(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        set_available_page(key, response.data)
+        return response
+
+
+class BicycleSearchAPIView(generics.ListAPIView):
+    """
+    Available bicycles whose model contains ``q``, within an optional
+    ``min_price``/``max_price`` range. Paged like the available list.
+    """
+
+    serializer_class = BicycleSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = AvailableBicyclesPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Bicycle.objects.none()
+        params = BicycleSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return Bicycle.objects.filter(in_rent=False).search(
+            params.validated_data.get('q'),
+            params.validated_data.get('min_price'),
+            params.validated_data.get('max_price'),
+        )
+
+
+class AvailableBicyclesCacheStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(available_stats())
+
+
+@require_GET
+@async_jwt_required
+async def available_bicycles_async(request):
+    """
+    Async variant of ``AvailableBicyclesListAPIView`` for ASGI workers.
+
+    Shares the page cache with the sync view and pages with a keyset
+    ``cursor`` over the same partial index.
+    """
+    try:
+        page_size = keyset.get_page_size(request.GET)
+        cursor = request.GET.get('cursor')
+        cursor = keyset.decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        return JsonResponse({'detail': str(exc)}, status=400)
+
+    key = await sync_to_async(available_page_key)(request.build_absolute_uri())
+    data = await sync_to_async(get_available_page)(key)
+    if data is not None:
+        return JsonResponse(data)
+
+    queryset = Bicycle.objects.filter(in_rent=False).order_by(
+        '-added_at', '-id'
+    )
+    if cursor is not None:
+        queryset = queryset.filter(keyset.after_cursor('added_at', cursor))
+    bicycles = [
+        bicycle async for bicycle in queryset[: page_size + 1].aiterator()
+    ]
+    data = {
+        'next': keyset.next_url(request, bicycles, page_size, 'added_at'),
+        'results': BicycleSerializer(bicycles[:page_size], many=True).data,
+    }
+    await sync_to_async(set_available_page)(key, data)
+    return JsonResponse(data)
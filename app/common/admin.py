@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that takes the row count of an unfiltered changelist
+    from the Postgres planner statistics instead of a ``COUNT(*)``.
+
+    Filtered querysets, small tables and other databases are counted
+    exactly. Use with ``show_full_result_count = False``.
+    """
+
+    # Below this estimate an exact count is cheap enough.
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and estimate >= self.exact_count_limit:
+            return estimate
+        return super().count
+
+    def estimate(self):
+        """
+        :return: estimated row count, or None if it does not apply
+        """
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [self.object_list.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter with a text box instead of one link per value, for
+    columns with too many values to list.
+    """
+
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # SimpleListFilter only renders when there is a lookup.
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'query_parts': [
+                (name, value)
+                for name, values in changelist.filter_params.items()
+                if name != self.parameter_name
+                for value in values
+            ],
+        }
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        return {}
+
+
+def _truncate(value, kind):
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind in ('year', 'month'):
+        value = value.replace(day=1)
+    if kind == 'year':
+        value = value.replace(month=1)
+    return value
+
+
+def _next(value, kind):
+    if kind == 'year':
+        return value.replace(year=value.year + 1)
+    if kind == 'month':
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    return value + timedelta(days=1)
+
+
+def _field_name(aggregate):
+    expressions = aggregate.get_source_expressions()
+    if len(expressions) == 1 and isinstance(expressions[0], models.F):
+        return expressions[0].name
+    return None
+
+
+class DateHierarchyQuerySet(models.QuerySet):
+    """
+    QuerySet for changelists with a ``date_hierarchy`` on an indexed
+    datetime field.
+
+    The admin builds the year, month and day links with ``datetimes()``,
+    a ``SELECT DISTINCT`` over every row in range. Here each candidate
+    period between the first and last value is probed with an
+    ``EXISTS`` on an index range instead, so the cost grows with the
+    number of periods and not with the number of rows.
+
+    The ``date_hierarchy`` tag aggregates the first and last value on
+    the same queryset before asking for the links; that result is kept
+    and reused as the bounds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._date_bounds = {}
+
+    def aggregate(self, *args, **kwargs):
+        result = super().aggregate(*args, **kwargs)
+        first, last = kwargs.get('first'), kwargs.get('last')
+        if (
+            not args
+            and isinstance(first, models.Min)
+            and isinstance(last, models.Max)
+        ):
+            field_name = _field_name(first)
+            if field_name and field_name == _field_name(last):
+                self._date_bounds[field_name] = result
+        return result
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day') or order != 'ASC':
+            return super().datetimes(field_name, kind, order, tzinfo)
+        bounds = self._date_bounds.get(field_name)
+        if bounds is None:
+            bounds = self.aggregate(
+                first=models.Min(field_name), last=models.Max(field_name)
+            )
+        if bounds['first'] is None:
+            return []
+        tzinfo = tzinfo or timezone.get_current_timezone()
+        current = _truncate(timezone.localtime(bounds['first'], tzinfo), kind)
+        last = timezone.localtime(bounds['last'], tzinfo)
+        periods = []
+        while current <= last:
+            following = _next(current, kind)
+            if self.filter(
+                **{
+                    f'{field_name}__gte': current,
+                    f'{field_name}__lt': following,
+                }
+            ).exists():
+                periods.append(current)
+            current = following
+        return periods
+
+
+class IndexedDateHierarchyMixin:
+    """
+    ModelAdmin mixin serving the changelist from a DateHierarchyQuerySet.
+
+    The queryset of the default manager is kept, filters and ordering
+    included, and only its class is swapped; methods of a custom
+    QuerySet subclass are therefore not available on it.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)._chain()
+        queryset.__class__ = DateHierarchyQuerySet
+        queryset._date_bounds = {}
+        return queryset
@@ -0,0 +1,77 @@
+"""
+Small HTTP load helpers shared by the benchmark commands.
+"""
+
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def request(method, url, headers=None, data=None, timeout=30):
+    """
+    Send one request and time it.
+
+    :return: ``(status, seconds, body)``; status is 0 on a network error
+    """
+    req = urllib.request.Request(
+        url, data=data, headers=headers or {}, method=method
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        body = exc.read()
+        status = exc.code
+    except (urllib.error.URLError, OSError):
+        body = b''
+        status = 0
+    return status, time.perf_counter() - started, body
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1,
+        max(0, round(fraction * len(sorted_values)) - 1),
+    )
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    """
+    :param results: ``(status, seconds)`` pairs
+    :param elapsed: wall time of the whole run in seconds
+    """
+    latencies = sorted(seconds for _, seconds in results)
+    return {
+        'requests': len(results),
+        'rps': len(results) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': sum(
+            1
+            for status, _ in results
+            if not 200 <= status < 400 and status != 409
+        ),
+        'conflicts': sum(1 for status, _ in results if status == 409),
+    }
+
+
+def hammer(url, headers, total, concurrency):
+    """
+    GET ``url`` ``total`` times from ``concurrency`` threads.
+    """
+
+    def get(_):
+        status, seconds, _body = request('GET', url, headers)
+        return status, seconds
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(get, range(total)))
+    return summarize(results, time.perf_counter() - started)
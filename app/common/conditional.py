@@ -0,0 +1,46 @@
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+
+
+def make_etag(*parts):
+    """
+    Strong ETag from the string forms of ``parts``.
+
+    :return: quoted entity tag
+    """
+    digest = hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+class ConditionalListMixin:
+    """
+    ListAPIView mixin answering unchanged lists with 304 Not Modified.
+
+    The ETag is built from ``get_list_version()``, which must change
+    whenever the listed data does, and from the requested URL and media
+    type. A matching ``If-None-Match`` is answered before ``list()`` runs,
+    so the rows are neither queried nor serialized.
+    """
+
+    def get_list_version(self, request):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag = make_etag(
+            self.get_list_version(request),
+            request.get_full_path(),
+            request.accepted_media_type,
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        # Clients must revalidate; shared caches must not mix users.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
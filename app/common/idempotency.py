@@ -0,0 +1,133 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# The lock outlives a stuck request; duplicates give up waiting sooner.
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _key(user_id, idempotency_key):
+    digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    return f'idempotency:{user_id}:{digest}'
+
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f'{request.method} {request.path} {payload}'.encode()
+    ).hexdigest()
+
+
+def _error(detail, status_code):
+    return Response({'detail': detail}, status=status_code)
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return _error(
+            f'{IDEMPOTENCY_HEADER} was already used for another request.',
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _acquire(key, fingerprint):
+    """
+    Take the lock of ``key``, or wait for whoever holds it.
+
+    :return: ``(True, None)`` with the lock held, ``(False, stored)``
+        once the holder stored its response, or ``(False, None)`` if
+        it is still running after ``LOCK_WAIT`` seconds
+    """
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock, fingerprint, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False, None
+        time.sleep(LOCK_POLL_INTERVAL)
+        stored = cache.get(key)
+        if stored is not None:
+            return False, stored
+    # The previous holder may have stored its response just before
+    # releasing the lock.
+    stored = cache.get(key)
+    if stored is not None:
+        cache.delete(lock)
+        return False, stored
+    return True, None
+
+
+def idempotent(handler):
+    """
+    Make an APIView handler safe to retry with an ``Idempotency-Key``.
+
+    The first response to a key is kept in Redis for a day together
+    with a fingerprint of the request, and retries with the same key
+    get it back without running the handler, so without touching the
+    database. Keys are scoped per user. A duplicate that arrives while
+    the first request is still running waits behind a lock and then
+    gets the same response. Reusing a key for a different request is
+    answered with 422.
+
+    Only responses the handler returns are stored; when it raises, the
+    key is released and a retry runs again. Requests without the header
+    are not affected.
+    """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            return handler(self, request, *args, **kwargs)
+        if not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            return _error(
+                f'{IDEMPOTENCY_HEADER} must be 1 to '
+                f'{IDEMPOTENCY_KEY_MAX_LENGTH} characters long.',
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        key = _key(request.user.pk, idempotency_key)
+        fingerprint = _fingerprint(request)
+        stored = cache.get(key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        acquired, stored = _acquire(key, fingerprint)
+        if not acquired:
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            return _error(
+                'A request with this '
+                f'{IDEMPOTENCY_HEADER} is still in progress.',
+                status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(
+                    key,
+                    {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'data': response.data,
+                    },
+                    IDEMPOTENCY_TIMEOUT,
+                )
+        finally:
+            cache.delete(f'{key}:lock')
+        return response
+
+    return wrapper
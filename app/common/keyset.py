@@ -0,0 +1,68 @@
+"""
+Keyset pagination helpers for async views.
+
+DRF pagination classes are sync-only; these build the same kind of
+opaque cursor over an ``(ordering field, id)`` pair, both descending.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(value, pk):
+    payload = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor):
+    """
+    :raises ValueError: if the cursor was not made by ``encode_cursor``
+    """
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = parse_datetime(value)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor.')
+    if value is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor.')
+    return value, pk
+
+
+def get_page_size(params):
+    """
+    :raises ValueError: if ``page_size`` is not a positive integer
+    """
+    page_size = int(params.get('page_size', PAGE_SIZE))
+    if page_size < 1:
+        raise ValueError('Invalid page size.')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def after_cursor(field, cursor):
+    """
+    Filter for the rows that follow ``cursor`` in ``(-field, -id)``
+    order.
+    """
+    value, pk = cursor
+    return Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+
+
+def next_url(request, items, page_size, field):
+    """
+    Link to the page after ``items``, or None on the last page.
+
+    ``items`` must hold up to ``page_size + 1`` rows; the extra one
+    only signals that another page exists.
+    """
+    if len(items) <= page_size:
+        return None
+    last = items[page_size - 1]
+    params = request.GET.copy()
+    params['cursor'] = encode_cursor(getattr(last, field), last.pk)
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
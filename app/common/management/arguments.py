@@ -0,0 +1,20 @@
+from argparse import ArgumentTypeError
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def iso_datetime(value):
+    """
+    ``type`` of command arguments taking an ISO 8601 datetime.
+
+    Naive values are read in the current time zone.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ArgumentTypeError(
+            f'Expected an ISO 8601 datetime, got {value!r}.'
+        )
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
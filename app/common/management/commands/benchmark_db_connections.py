@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from common.benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the per-request database latency with a fresh connection '
+        'per request and with a persistent one, as in a WSGI worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def _run(self, iterations, reconnect):
+        latencies = []
+        for _ in range(iterations):
+            if reconnect:
+                connection.close()
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            latencies.append(time.perf_counter() - started)
+        return sorted(latencies)
+
+    def handle(self, *args, iterations, **options):
+        results = {
+            'fresh': self._run(iterations, reconnect=True),
+            'persistent': self._run(iterations, reconnect=False),
+        }
+        for name, latencies in results.items():
+            self.stdout.write(
+                f'{name:<11} mean {sum(latencies) / len(latencies) * 1000:7.3f}'
+                f' ms  p50 {percentile(latencies, 0.50) * 1000:7.3f} ms'
+                f'  p95 {percentile(latencies, 0.95) * 1000:7.3f} ms'
+            )
+        saved = (
+            sum(results['fresh']) - sum(results['persistent'])
+        ) / iterations
+        self.stdout.write(
+            self.style.SUCCESS(f'Saved per request: {saved * 1000:.3f} ms')
+        )
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.benchmark import hammer
+
+User = get_user_model()
+
+ENDPOINTS = (
+    (
+        'available',
+        '/api/v1/bicycles/available/',
+        '/api/v1/bicycles/available/async/',
+    ),
+    (
+        'history',
+        '/api/v1/rentals/history/',
+        '/api/v1/rentals/history/async/',
+    ),
+    ('me', '/api/v1/users/me/', '/api/v1/users/me/async/'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync read endpoints served over WSGI with their async '
+        'variants served over ASGI. Both servers must already be running '
+        'against this database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wsgi-url',
+            default='http://localhost:8000',
+            help='Base URL of the WSGI server.',
+        )
+        parser.add_argument(
+            '--asgi-url',
+            default='http://localhost:8001',
+            help='Base URL of the ASGI server.',
+        )
+        parser.add_argument('--requests', type=int, default=1_000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--email',
+            default='bench@example.com',
+            help='User the requests are made as; created if missing.',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            user = User.objects.create_user(
+                email=options['email'], name='Benchmark'
+            )
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+        self.stdout.write(
+            f'{"endpoint":<10} {"server":<5} {"rps":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"errors":>7}'
+        )
+        for name, sync_path, async_path in ENDPOINTS:
+            for server, url in (
+                ('wsgi', options['wsgi_url'] + sync_path),
+                ('asgi', options['asgi_url'] + async_path),
+            ):
+                stats = hammer(
+                    url, headers, options['requests'], options['concurrency']
+                )
+                self.stdout.write(
+                    f'{name:<10} {server:<5} {stats["rps"]:>8.1f} '
+                    f'{stats["p50_ms"]:>8.2f} {stats["p95_ms"]:>8.2f} '
+                    f'{stats["p99_ms"]:>8.2f} {stats["errors"]:>7}'
+                )
@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.benchmark import percentile
+from common.throttling import IPTokenBucketThrottle, get_token_bucket_script
+
+# Documentation range, so no real client shares the bucket.
+CLIENT_IP = '192.0.2.1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the time the token bucket throttle adds to a request: '
+        'one Lua script call to the throttle Redis.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2_000)
+        parser.add_argument(
+            '--scope',
+            default='token',
+            help='throttle_scope of the view, its ip rate is used.',
+        )
+
+    def handle(self, *args, iterations, scope, **options):
+        request = Request(APIRequestFactory().post('/', REMOTE_ADDR=CLIENT_IP))
+        view = SimpleNamespace(throttle_scope=scope)
+        throttle = IPTokenBucketThrottle()
+        # The first call loads the script into Redis.
+        throttle.allow_request(request, view)
+
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            throttle.allow_request(request, view)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        get_token_bucket_script().registered_client.delete(throttle.key)
+
+        self.stdout.write(
+            f'throttle  mean {sum(latencies) / len(latencies) * 1000:7.3f}'
+            f' ms  p50 {percentile(latencies, 0.50) * 1000:7.3f} ms'
+            f'  p95 {percentile(latencies, 0.95) * 1000:7.3f} ms'
+            f'  p99 {percentile(latencies, 0.99) * 1000:7.3f} ms'
+        )
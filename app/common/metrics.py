@@ -0,0 +1,73 @@
+"""
+Application metrics exported at ``/metrics``.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set, every worker process writes its
+samples to that directory and the scrape aggregates all of them, so the
+numbers are right under multi-process WSGI/ASGI servers and Celery's
+prefork pool. The directory must be emptied when the service starts.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'django_request_latency_seconds',
+    'Request latency by URL name.',
+    ['url_name', 'method'],
+)
+REQUEST_DB_QUERIES = Histogram(
+    'django_request_db_queries',
+    'Database queries issued per request.',
+    ['url_name'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    'django_request_db_duration_seconds',
+    'Time spent in database queries per request.',
+    ['url_name'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Application cache lookups by cache and result (hit/miss).',
+    ['cache', 'result'],
+)
+RENTALS_STARTED = Counter('rentals_started_total', 'Rentals started.')
+RENTALS_RETURNED = Counter('rentals_returned_total', 'Rentals returned.')
+CELERY_TASK_RUNTIME = Histogram(
+    'celery_task_runtime_seconds',
+    'Celery task runtime by task name and final state.',
+    ['task', 'state'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render():
+    """
+    :return: ``(body, content_type)`` of a scrape
+    """
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,89 @@
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.db import connection
+
+from common.metrics import (
+    REQUEST_DB_DURATION,
+    REQUEST_DB_QUERIES,
+    REQUEST_LATENCY,
+)
+
+
+class QueryStats:
+    """
+    Execute wrapper counting and timing the queries of one request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+# Resolved in the calling thread, where ``connection`` is looked up.
+def _add_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class MetricsMiddleware:
+    """
+    Observe latency and database queries per request, by URL name.
+
+    Supports both sync and async chains, so under ASGI the async views
+    are not adapted to sync behind it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        self.observe(request, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        # Async views query through sync_to_async, on the connection of
+        # the request's thread-sensitive executor, not of the event loop.
+        await sync_to_async(_add_wrapper)(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(stats)
+        self.observe(request, stats, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, stats, latency):
+        # Unresolved paths share one label to keep cardinality bounded.
+        match = request.resolver_match
+        url_name = match.view_name if match else '<unresolved>'
+        REQUEST_LATENCY.labels(url_name, request.method).observe(latency)
+        REQUEST_DB_QUERIES.labels(url_name).observe(stats.count)
+        REQUEST_DB_DURATION.labels(url_name).observe(stats.duration)
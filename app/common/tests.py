@@ -0,0 +1,566 @@
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+
+import redis
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.db import connection
+from django.db.models import Max, Min
+from django.urls import URLResolver, get_resolver, resolve, reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bicycles.models import Bicycle
+from common.admin import DateHierarchyQuerySet, EstimatedCountPaginator
+from common.middleware import MetricsMiddleware
+from common import throttling
+from rentals.models import Rental
+from users.cache import aset_user, set_user
+
+User = get_user_model()
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        self.bicycle = Bicycle.objects.create(model='Test Bike', price='10.00')
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_metrics_endpoint(self):
+        # Test that the scrape lists the application metrics
+        self.client.get(reverse('available-bicycles-list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        for name in (
+            b'django_request_latency_seconds',
+            b'django_request_db_queries',
+            b'django_request_db_duration_seconds',
+            b'rentals_started_total',
+            b'rentals_returned_total',
+        ):
+            self.assertIn(name, response.content)
+
+    def test_request_metrics_by_url_name(self):
+        # Test that latency and query counts are labelled by URL name
+        labels = {'url_name': 'rental-detail'}
+        before = self.sample('django_request_db_queries_count', **labels)
+        queries = self.sample('django_request_db_queries_sum', **labels)
+        self.client.force_authenticate(user=self.user)
+
+        self.client.get(reverse('rental-detail', args=[1]))
+
+        self.assertEqual(
+            self.sample('django_request_db_queries_count', **labels),
+            before + 1,
+        )
+        self.assertEqual(
+            self.sample('django_request_db_queries_sum', **labels), queries + 1
+        )
+        self.assertGreater(
+            self.sample(
+                'django_request_latency_seconds_count',
+                method='GET',
+                **labels,
+            ),
+            0,
+        )
+
+    def test_async_chain(self):
+        # Test that an async handler is not adapted to sync
+        async def get_response(request):
+            return None
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda r: r)))
+
+    async def test_async_request_metrics(self):
+        # Test that queries of a native async view are counted
+        labels = {'url_name': 'available-bicycles-list-async'}
+        queries = self.sample('django_request_db_queries_sum', **labels)
+        token = AccessToken.for_user(self.user)
+        await aset_user(self.user)
+
+        response = await AsyncClient().get(
+            reverse('available-bicycles-list-async'),
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.sample('django_request_db_queries_sum', **labels),
+            queries + 1,
+        )
+
+    def test_rental_counters(self):
+        # Test that started and returned rentals are counted on commit
+        started = self.sample('rentals_started_total')
+        returned = self.sample('rentals_returned_total')
+        self.client.force_authenticate(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('rental-create'),
+                {'bicycle': self.bicycle.id},
+                format='json',
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('rental-detail', args=[response.data['id']]), {}
+            )
+
+        self.assertEqual(self.sample('rentals_started_total'), started + 1)
+        self.assertEqual(self.sample('rentals_returned_total'), returned + 1)
+
+
+def _route_names(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _route_names(
+                pattern.url_patterns, pattern.namespace or namespace
+            )
+        elif pattern.name and namespace is None:
+            yield pattern.name
+
+
+THROTTLE_RATES = {
+    'token:ip': '2/min',
+    'register:ip': '2/min',
+    'rentals-create:user': '1/min',
+}
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,
+    }
+)
+class ThrottlingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        self.bicycles = [
+            Bicycle.objects.create(model=f'Test Bike {i}', price='10.00')
+            for i in range(3)
+        ]
+
+    def login(self, client=None):
+        return (client or self.client).post(
+            reverse('token-obtain-pair'),
+            {'email': 'test@example.com', 'password': 'wrong'},
+        )
+
+    def rent(self, client, bicycle):
+        return client.post(
+            reverse('rental-create'), {'bicycle': bicycle.id}, format='json'
+        )
+
+    def test_burst_then_retry_after(self):
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 401)
+
+        response = self.login()
+
+        self.assertEqual(response.status_code, 429)
+        # One token per 30 seconds at 2/min.
+        self.assertTrue(0 < int(response['Retry-After']) <= 30)
+
+    def test_ip_scope_per_client(self):
+        self.login()
+        self.login()
+
+        other = APIClient(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(self.login(other).status_code, 401)
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_forged_forwarded_for_ignored(self):
+        # Only the address appended by the proxy identifies the client
+        for forged in ('1.1.1.1', '2.2.2.2'):
+            self.client.credentials(HTTP_X_FORWARDED_FOR=f'{forged}, 10.0.0.9')
+            self.assertEqual(self.login().status_code, 401)
+
+        self.client.credentials(HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.9')
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_user_scope_per_user(self):
+        other_user = User.objects.create_user(
+            email='other@example.com', password='testpass123'
+        )
+        first, second = APIClient(), APIClient()
+        first.force_authenticate(self.user)
+        second.force_authenticate(other_user)
+
+        self.assertEqual(self.rent(first, self.bicycles[0]).status_code, 201)
+        self.assertEqual(self.rent(second, self.bicycles[1]).status_code, 201)
+        self.assertEqual(self.rent(first, self.bicycles[2]).status_code, 429)
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {**THROTTLE_RATES, 'token:ip': '5/s'},
+        }
+    )
+    def test_bucket_refills(self):
+        request = Request(APIRequestFactory().post('/'))
+        view = mock.Mock(throttle_scope='token')
+        throttle = throttling.IPTokenBucketThrottle()
+
+        allowed = [throttle.allow_request(request, view) for _ in range(6)]
+        self.assertEqual(allowed, [True] * 5 + [False])
+        self.assertTrue(0 < throttle.wait() <= 0.2)
+
+        time.sleep(0.25)
+
+        self.assertTrue(throttle.allow_request(request, view))
+        self.assertFalse(throttle.allow_request(request, view))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+
+        call_command('benchmark_throttling', iterations=5, stdout=out)
+
+        self.assertIn('throttle  mean', out.getvalue())
+
+    def test_redis_down_lets_requests_through(self):
+        script = mock.Mock(side_effect=redis.ConnectionError)
+        with mock.patch.object(
+            throttling, 'get_token_bucket_script', return_value=script
+        ):
+            with self.assertLogs('common.throttling', 'WARNING'):
+                for _ in range(3):
+                    self.assertEqual(self.login().status_code, 401)
+
+
+class AsgiTestCase(SimpleTestCase):
+    def test_refuses_persistent_connections(self):
+        # Settings already loaded keep their CONN_MAX_AGE
+        with mock.patch.dict(
+            settings.DATABASES['default'], {'CONN_MAX_AGE': 60}
+        ), mock.patch.dict(os.environ), mock.patch.dict(sys.modules):
+            sys.modules.pop('app.asgi', None)
+            with self.assertRaises(ImproperlyConfigured):
+                import_module('app.asgi')
+
+
+class SchemaTestCase(TestCase):
+    def setUp(self):
+        self.view_class = resolve('/').func.view_class
+        self.view_class.rendered.clear()
+
+    def test_spec_generated_once(self):
+        url = reverse('schema-swagger-ui') + '?format=openapi'
+        generator_class = self.view_class.generator_class
+        with mock.patch.object(
+            generator_class,
+            'get_schema',
+            autospec=True,
+            side_effect=generator_class.get_schema,
+        ) as get_schema:
+            first = self.client.get(url)
+            second = self.client.get(url, HTTP_HOST='evil.example.com')
+            redoc = self.client.get(
+                reverse('schema-redoc') + '?format=openapi'
+            )
+
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        spec = json.loads(first.content)
+        self.assertEqual(spec['basePath'], '/api/v1')
+        self.assertIn('/rentals/history/', spec['paths'])
+        self.assertNotIn('host', spec)
+        self.assertNotIn(b'evil.example.com', second.content)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], redoc['ETag'])
+
+    def test_not_modified(self):
+        url = reverse('schema-swagger-ui') + '?format=openapi'
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_ui_page(self):
+        response = self.client.get(reverse('schema-swagger-ui'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'swagger')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class EstimatedCountPaginatorTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        bicycle = Bicycle.objects.create(model='Test Bike', price='10.00')
+        Rental.objects.bulk_create(
+            Rental(bicycle=bicycle, renter=user) for _ in range(30)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'ANALYZE {}'.format(
+                    connection.ops.quote_name(Rental._meta.db_table)
+                )
+            )
+
+    def paginator(self, queryset, exact_count_limit=10):
+        paginator = EstimatedCountPaginator(queryset.order_by('id'), 10)
+        paginator.exact_count_limit = exact_count_limit
+        return paginator
+
+    def test_unfiltered_uses_statistics(self):
+        # One query for the statistics, no COUNT(*).
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginator(Rental.objects.all()).count, 30)
+
+    def test_exact_when_filtered_or_small(self):
+        self.assertEqual(
+            self.paginator(Rental.objects.filter(is_returned=False)).count,
+            30,
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                self.paginator(
+                    Rental.objects.all(), exact_count_limit=100
+                ).count,
+                30,
+            )
+
+
+class DateHierarchyQuerySetTestCase(TestCase):
+    def test_matches_distinct_datetimes(self):
+        user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        bicycle = Bicycle.objects.create(model='Test Bike', price='10.00')
+        now = timezone.now()
+        Rental.objects.bulk_create(
+            Rental(bicycle=bicycle, renter=user, start_time=now - delta)
+            for delta in (timedelta(0), timedelta(days=3), timedelta(days=400))
+        )
+        queryset = DateHierarchyQuerySet(Rental)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    queryset.datetimes('start_time', kind),
+                    list(Rental.objects.datetimes('start_time', kind)),
+                )
+
+    def test_reuses_aggregated_bounds(self):
+        user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        bicycle = Bicycle.objects.create(model='Test Bike', price='10.00')
+        Rental.objects.create(bicycle=bicycle, renter=user)
+        queryset = DateHierarchyQuerySet(Rental)
+        queryset.aggregate(first=Min('start_time'), last=Max('start_time'))
+
+        # One EXISTS for the single year, no second Min/Max
+        with self.assertNumQueries(1):
+            years = queryset.datetimes('start_time', 'year')
+
+        self.assertEqual(len(years), 1)
+        self.assertEqual(queryset.filter(pk=0)._date_bounds, {})
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Exact number of queries every route may issue.
+
+    A change that adds a query fails here; one that removes a query
+    should lower the budget. Admin pages are budgeted where they list
+    a model, the rest of the admin namespace is Django's. List
+    endpoints are also measured at several table sizes to prove their
+    cost does not grow with data.
+    """
+
+    # (route name, method): queries, with a warm auth cache
+    BUDGETS = {
+        ('metrics', 'GET'): 0,
+        ('token-obtain-pair', 'POST'): 1,
+        ('token-refresh', 'POST'): 0,
+        ('user-registration', 'POST'): 2,
+        ('user-me', 'GET'): 0,
+        ('user-me-async', 'GET'): 0,
+        ('user-update', 'PATCH'): 2,
+        ('available-bicycles-list', 'GET'): 1,
+        ('available-bicycles-list-async', 'GET'): 1,
+        ('available-bicycles-search', 'GET'): 1,
+        ('available-bicycles-cache-stats', 'GET'): 0,
+        ('rental-detail', 'GET'): 1,
+        ('rental-detail', 'PATCH'): 7,
+        ('rental-history', 'GET'): 1,
+        ('rental-history-async', 'GET'): 1,
+        ('rental-create', 'POST'): 6,
+        ('rental-export', 'GET'): 1,
+        ('rental-analytics', 'GET'): 1,
+        ('rental-utilization', 'GET'): 2,
+        ('schema-swagger-ui', 'GET'): 0,
+        ('schema-redoc', 'GET'): 0,
+        ('admin:bicycles_bicycle_changelist', 'GET'): 5,
+        # Session, user, estimate, count, page, and the date hierarchy:
+        # first/last start time plus one EXISTS per shown period.
+        ('admin:rentals_rental_changelist', 'GET'): 7,
+    }
+    SCALES = (1, 100, 10_000)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(
+            email='admin@example.com', password='testpass123'
+        )
+        set_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.client.force_login(self.user)
+        self.bicycle = Bicycle.objects.create(model='Test Bike', price='10.00')
+        self.rental = Rental.objects.create(
+            bicycle=Bicycle.objects.create(
+                model='Rented Bike', price='10.00', in_rent=True
+            ),
+            renter=self.user,
+        )
+
+    def assertBudget(self, name, method, path, data=None):
+        budget = self.BUDGETS[(name, method)]
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method.lower())(
+                path, data, format='json'
+            )
+            # Streamed rows are only queried while the body is consumed.
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+        self.assertLess(response.status_code, 400, body)
+        return response, body
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {name for name, _ in self.BUDGETS}
+        for name in _route_names(get_resolver().url_patterns):
+            with self.subTest(route=name):
+                self.assertIn(name, budgeted)
+
+    def test_user_routes(self):
+        self.assertBudget('metrics', 'GET', reverse('metrics'))
+        response, _ = self.assertBudget(
+            'token-obtain-pair',
+            'POST',
+            reverse('token-obtain-pair'),
+            {'email': 'admin@example.com', 'password': 'testpass123'},
+        )
+        self.assertBudget(
+            'token-refresh',
+            'POST',
+            reverse('token-refresh'),
+            {'refresh': response.data['refresh']},
+        )
+        self.assertBudget(
+            'user-registration',
+            'POST',
+            reverse('user-registration'),
+            {
+                'email': 'new@example.com',
+                'password': 'testpass123',
+                'name': 'New User',
+            },
+        )
+        self.assertBudget('user-me', 'GET', reverse('user-me'))
+        self.assertBudget('user-me-async', 'GET', reverse('user-me-async'))
+        self.assertBudget(
+            'user-update', 'PATCH', reverse('user-update'), {'name': 'Admin'}
+        )
+
+    def test_rental_routes(self):
+        detail = reverse('rental-detail', args=[self.rental.pk])
+        self.assertBudget('rental-detail', 'GET', detail)
+        self.assertBudget('rental-detail', 'PATCH', detail, {})
+        self.assertBudget(
+            'rental-create',
+            'POST',
+            reverse('rental-create'),
+            {'bicycle': self.bicycle.pk},
+        )
+
+    def test_schema_routes(self):
+        self.assertBudget(
+            'schema-swagger-ui', 'GET', reverse('schema-swagger-ui')
+        )
+        self.assertBudget(
+            'schema-redoc', 'GET', reverse('schema-redoc') + '?format=openapi'
+        )
+
+    def test_cache_stats_route(self):
+        self.assertBudget(
+            'available-bicycles-cache-stats',
+            'GET',
+            reverse('available-bicycles-cache-stats'),
+        )
+
+    def test_list_routes_are_constant(self):
+        bicycles = rentals = 1
+        for rows in self.SCALES:
+            Bicycle.objects.bulk_create(
+                Bicycle(model=f'Bike {i}', price='10.00')
+                for i in range(rows - bicycles)
+            )
+            Rental.objects.bulk_create(
+                Rental(
+                    bicycle=self.bicycle, renter=self.user, is_returned=True
+                )
+                for _ in range(rows - rentals)
+            )
+            bicycles = rentals = rows
+            for name in (
+                'available-bicycles-list',
+                'available-bicycles-list-async',
+                'available-bicycles-search',
+                'rental-history',
+                'rental-history-async',
+                'rental-export',
+                'rental-analytics',
+                'rental-utilization',
+                'admin:bicycles_bicycle_changelist',
+                'admin:rentals_rental_changelist',
+            ):
+                with self.subTest(route=name, rows=rows):
+                    cache.clear()
+                    set_user(self.user)
+                    response, body = self.assertBudget(
+                        name, 'GET', reverse(name)
+                    )
+                    if response.streaming:
+                        self.assertEqual(len(body.splitlines()), rows)
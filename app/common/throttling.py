@@ -0,0 +1,127 @@
+import logging
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: bucket. ARGV: capacity, refill rate in tokens per second.
+# Refills by the time elapsed since the last call, on the Redis clock so
+# every worker agrees, then takes one token if there is one. Returns
+# 1 or 0 and, as a string, the seconds until a token is available.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(wait)}
+"""
+
+
+@lru_cache(maxsize=None)
+def get_token_bucket_script():
+    client = redis.Redis.from_url(
+        settings.THROTTLE_REDIS_URL,
+        socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+        socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+    )
+    return client.register_script(TOKEN_BUCKET_LUA)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket kept in Redis and updated by one atomic Lua script.
+
+    A rate of ``'N/period'`` from ``DEFAULT_THROTTLE_RATES`` is a bucket
+    of N tokens refilled over the period, so a client may burst N
+    requests and then continues at the average rate. The views set
+    ``throttle_scope``; the rate is looked up as
+    ``'<throttle_scope>:<kind>'``. If Redis cannot be reached, requests
+    are let through rather than failed.
+    """
+
+    kind = None
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # The rate depends on the view, see allow_request.
+        pass
+
+    def get_rate(self):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        try:
+            return rates[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'No throttle rate set for scope {self.scope!r}.'
+            )
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}:{self.kind}'
+        self.num_requests, self.duration = self.parse_rate(self.get_rate())
+        self.key = self.get_cache_key(request, view)
+        try:
+            allowed, wait = get_token_bucket_script()(
+                keys=[self.key],
+                args=[self.num_requests, self.num_requests / self.duration],
+            )
+        except redis.RedisError:
+            logger.warning('Throttle %s skipped', self.scope, exc_info=True)
+            return True
+        self.wait_seconds = float(wait)
+        return bool(allowed)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Bucket per authenticated user, per IP for anonymous requests.
+    """
+
+    kind = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Bucket per client IP, whether or not the request is authenticated.
+    """
+
+    kind = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
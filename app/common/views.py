@@ -0,0 +1,8 @@
+from django.http import HttpResponse
+
+from common.metrics import render
+
+
+def metrics(request):
+    body, content_type = render()
+    return HttpResponse(body, content_type=content_type)
@@ -1,9 +1,46 @@
+import uuid
+
 from django.contrib import admin
+
+from common.admin import (
+    EstimatedCountPaginator,
+    IndexedDateHierarchyMixin,
+    InputFilter,
+)
 from .models import Rental
 
 
+class BicycleIdFilter(InputFilter):
+    title = 'bicycle id'
+    parameter_name = 'bicycle'
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(bicycle_id=value)
+
+
+class RenterFilter(InputFilter):
+    title = 'renter email or id'
+    parameter_name = 'renter'
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        if '@' in value:
+            return queryset.filter(renter__email=value)
+        try:
+            return queryset.filter(renter_id=uuid.UUID(value))
+        except ValueError:
+            return queryset.none()
+
+
 @admin.register(Rental)
-class RentalAdmin(admin.ModelAdmin):
+class RentalAdmin(IndexedDateHierarchyMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'bicycle',
@@ -14,11 +51,16 @@ class RentalAdmin(admin.ModelAdmin):
         'is_returned',
     )
     list_filter = (
-        'bicycle',
-        'renter',
-        'start_time',
+        BicycleIdFilter,
+        RenterFilter,
         'end_time',
         'is_returned',
+        'auto_closed',
     )
-    search_fields = ('bicycle__model', 'renter__username')
+    list_select_related = ('bicycle', 'renter')
+    date_hierarchy = 'start_time'
+    autocomplete_fields = ('bicycle', 'renter')
+    search_fields = ('bicycle__model', '=renter__email')
     readonly_fields = ('total_cost',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,202 @@
+"""
+Fleet utilization over rental intervals, computed with NumPy.
+
+Rentals are loaded as (bicycle_id, start, end) columns, with times as
+int64 microseconds from the window start, and never as model instances.
+"""
+
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.db.models import DurationField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from bicycles.models import Bicycle
+from rentals.models import Rental
+
+CHUNK_SIZE = 10_000
+IDLE_GAP_PERCENTILES = (50, 90, 99)
+MICROSECONDS = 1_000_000
+
+
+def _offset(expression, origin):
+    return ExpressionWrapper(
+        expression - Value(origin), output_field=DurationField()
+    )
+
+
+def load_intervals(since, until, chunk_size=CHUNK_SIZE):
+    """
+    Rentals overlapping ``[since, until)``. Open rentals run until now.
+
+    :return: (bicycle_ids, starts, ends) int64 arrays, times in
+        microseconds from ``since``
+    """
+    rows = (
+        Rental.objects.filter(
+            Q(end_time__isnull=True) | Q(end_time__gt=since),
+            start_time__lt=until,
+        )
+        .annotate(
+            start_offset=_offset(F('start_time'), since),
+            end_offset=_offset(
+                Coalesce(F('end_time'), Value(timezone.now())), since
+            ),
+        )
+        .values_list('bicycle_id', 'start_offset', 'end_offset')
+        .iterator(chunk_size=chunk_size)
+    )
+    columns = [], [], []
+    while chunk := list(islice(rows, chunk_size)):
+        bicycle_ids, starts, ends = zip(*chunk)
+        columns[0].append(np.array(bicycle_ids, dtype=np.int64))
+        for column, values in ((columns[1], starts), (columns[2], ends)):
+            column.append(
+                np.array(values, dtype='timedelta64[us]').astype(np.int64)
+            )
+    return tuple(
+        np.concatenate(column) if column else np.empty(0, dtype=np.int64)
+        for column in columns
+    )
+
+
+def _running_max_by_group(values, groups):
+    """
+    Running maximum of ``values`` that restarts with each group.
+
+    ``groups`` must be sorted. Each pass doubles the distance looked
+    back, so the cost is log2 of the largest group in vectorized passes.
+    """
+    result = values.copy()
+    longest = np.bincount(groups).max() if len(groups) else 0
+    step = 1
+    while step < longest:
+        same = groups[step:] == groups[:-step]
+        result[step:] = np.where(
+            same, np.maximum(result[step:], result[:-step]), result[step:]
+        )
+        step *= 2
+    return result
+
+
+def utilization(bicycle_ids, starts, ends, window):
+    """
+    Busy time per bicycle, fleet concurrency and idle gaps.
+
+    Intervals are clipped to ``[0, window]``. Overlapping intervals of
+    one bicycle count once towards its busy time.
+
+    :param bicycle_ids: int64 array
+    :param starts: int64 array of interval starts
+    :param ends: int64 array of interval ends
+    :param window: window length, same unit as the times
+    :return: dict with ``bicycles`` (sorted unique ids) and per-bicycle
+        ``busy`` and ``rentals`` arrays, ``peak_concurrency``,
+        ``peak_at`` (offset), ``mean_concurrency`` and ``idle_gaps``
+        (array of gaps between consecutive rentals of a bicycle)
+    """
+    starts = np.clip(starts, 0, window)
+    ends = np.clip(ends, starts, window)
+    bicycles, index = np.unique(bicycle_ids, return_inverse=True)
+
+    # Sort by bicycle, then start: an interval only adds the part past
+    # the furthest end of the earlier intervals of its bicycle. The key
+    # uses the rank of the start and not the time, so it stays below
+    # len(starts) ** 2 whatever the window, and one argsort is enough.
+    ranks = np.empty(len(starts), dtype=np.int64)
+    ranks[np.argsort(starts)] = np.arange(len(starts))
+    order = np.argsort(index.astype(np.int64) * len(starts) + ranks)
+    index = index[order]
+    group_starts = starts[order]
+    group_ends = ends[order]
+    reach = _running_max_by_group(group_ends, index)
+    first = np.ones(len(index), dtype=bool)
+    first[1:] = index[1:] != index[:-1]
+    previous_reach = np.where(first, group_starts, np.roll(reach, 1))
+
+    covered = np.maximum(
+        group_ends - np.maximum(group_starts, previous_reach), 0
+    )
+    busy = np.bincount(index, weights=covered, minlength=len(bicycles))
+
+    gaps = group_starts[1:] - reach[:-1]
+    idle_gaps = gaps[~first[1:] & (gaps > 0)]
+
+    # Sweep line over time * 2 + 1 for starts and time * 2 for ends:
+    # ends sort first on ties, so back-to-back rentals do not overlap.
+    events = np.sort(np.concatenate((starts * 2 + 1, ends * 2)))
+    level = np.cumsum((events & 1) * 2 - 1)
+    peak = int(level.argmax()) if len(level) else None
+
+    return {
+        'bicycles': bicycles,
+        'busy': busy.astype(np.int64),
+        'rentals': np.bincount(index, minlength=len(bicycles)),
+        'peak_concurrency': int(level[peak]) if peak is not None else 0,
+        'peak_at': int(events[peak] // 2) if peak is not None else None,
+        'mean_concurrency': float((ends - starts).sum() / window),
+        'idle_gaps': idle_gaps,
+    }
+
+
+def fleet_utilization(since, until):
+    """
+    Utilization report of the whole fleet over ``[since, until)``.
+
+    :return: JSON-ready dict; times in seconds, utilization in percent
+    """
+    window = (until - since) // timedelta(microseconds=1)
+    result = utilization(*load_intervals(since, until), window)
+
+    # Bicycles without a rental in the window are idle the whole time.
+    fleet = np.union1d(
+        np.fromiter(Bicycle.objects.values_list('id', flat=True), np.int64),
+        result['bicycles'],
+    )
+    busy = np.zeros(len(fleet), np.int64)
+    rentals = np.zeros(len(fleet), np.int64)
+    positions = np.searchsorted(fleet, result['bicycles'])
+    busy[positions] = result['busy']
+    rentals[positions] = result['rentals']
+    percent = busy / window * 100
+
+    gaps = result['idle_gaps'] / MICROSECONDS
+    return {
+        'since': since,
+        'until': until,
+        'window_seconds': window / MICROSECONDS,
+        'rentals': int(rentals.sum()),
+        'utilization': round(float(percent.mean()), 2) if len(fleet) else 0,
+        'peak_concurrency': result['peak_concurrency'],
+        'peak_at': (
+            since + timedelta(microseconds=result['peak_at'])
+            if result['peak_at'] is not None
+            else None
+        ),
+        'mean_concurrency': round(result['mean_concurrency'], 3),
+        'idle_gaps': {
+            'count': len(gaps),
+            'mean_seconds': (
+                round(float(gaps.mean()), 1) if len(gaps) else None
+            ),
+            **{
+                f'p{q}_seconds': (
+                    round(float(np.percentile(gaps, q)), 1)
+                    if len(gaps)
+                    else None
+                )
+                for q in IDLE_GAP_PERCENTILES
+            },
+        },
+        'bicycles': [
+            {
+                'bicycle': int(fleet[i]),
+                'rentals': int(rentals[i]),
+                'busy_seconds': int(busy[i]) // MICROSECONDS,
+                'utilization': round(float(percent[i]), 2),
+            }
+            for i in np.argsort(-percent, kind='stable')
+        ],
+    }
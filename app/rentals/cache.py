@@ -0,0 +1,39 @@
+import time
+
+from django.core.cache import cache
+
+HISTORY_VERSION_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _history_version_key(user_id):
+    return f'rentals:history:{user_id}:version'
+
+
+def history_version(user_id):
+    """
+    Current generation of a user's rental history.
+
+    Seeded from the clock when missing, so a dropped or expired version
+    never comes back with a value a client has already seen.
+
+    :param user_id: primary key of the renter
+    """
+    key = _history_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=HISTORY_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_history(*user_ids):
+    """
+    Start a new generation of the given users' rental histories.
+
+    Deleting the versions in one round trip is enough: the next read
+    seeds a fresh one.
+
+    :param user_ids: primary keys of the renters
+    """
+    if user_ids:
+        cache.delete_many([_history_version_key(pk) for pk in user_ids])
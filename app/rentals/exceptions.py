@@ -0,0 +1,8 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class BicycleAlreadyRented(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This bicycle is already rented.'
+    default_code = 'bicycle_already_rented'
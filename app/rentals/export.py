@@ -0,0 +1,74 @@
+"""
+Streaming export of rentals for reconciliation.
+
+Rows are read through a server-side cursor and rendered one chunk at a
+time, so memory use does not depend on the size of the table.
+"""
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from rentals.models import Rental
+
+EXPORT_FIELDS = (
+    'id',
+    'bicycle_id',
+    'renter_id',
+    'start_time',
+    'end_time',
+    'total_cost',
+    'is_returned',
+)
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CHUNK_SIZE = 2_000
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(since=None, until=None, chunk_size=CHUNK_SIZE):
+    queryset = Rental.objects.order_by('id')
+    if since is not None:
+        queryset = queryset.filter(start_time__gte=since)
+    if until is not None:
+        queryset = queryset.filter(start_time__lt=until)
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row
+            ]
+        )
+
+
+def iter_export(output, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """
+    Rendered export lines.
+
+    :param output: one of ``EXPORT_FORMATS``
+    :param since: optional lower bound of ``start_time``, inclusive
+    :param until: optional upper bound of ``start_time``, exclusive
+    :param chunk_size: rows fetched from the cursor per round trip
+    """
+    rows = export_rows(since, until, chunk_size)
+    if output == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from common.management.arguments import iso_datetime
+from rentals.managers import bucket_starts
+from rentals.models import Rental, RentalRollup
+
+SHADOW_TABLE = 'rental_rollup_rebuild'
+# Rentals returned this long before the rebuild starts may still be in
+# an open transaction; they are added again under the lock.
+TAIL_MARGIN = timedelta(hours=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the hourly and daily rental rollups from finished "
+        "rentals into a shadow table, then swap it in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=iso_datetime,
+            help=(
+                'Only rebuild buckets from the day of this ISO 8601 '
+                'datetime on. Default: all of them.'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+            help='Rentals read and added per batch.',
+        )
+
+    def _add(self, rentals, day, batch_size):
+        last_id = 0
+        processed = 0
+        while True:
+            # Keyset pagination by id: every batch is an index range scan.
+            rows = list(
+                rentals.filter(id__gt=last_id).values_list(
+                    'id', 'bicycle_id', 'start_time', 'end_time', 'total_cost'
+                )[:batch_size]
+            )
+            if not rows:
+                return processed
+            last_id = rows[-1][0]
+            RentalRollup.objects.increment(
+                (row[1:] for row in rows), since=day, table=SHADOW_TABLE
+            )
+            processed += len(rows)
+
+    def handle(self, *args, since, batch_size, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The rollup rebuild needs PostgreSQL.')
+        quote = connection.ops.quote_name
+        table = quote(RentalRollup._meta.db_table)
+        shadow = quote(SHADOW_TABLE)
+        columns = ', '.join(
+            quote(field.column)
+            for field in RentalRollup._meta.concrete_fields
+            if not field.primary_key
+        )
+
+        rollups = RentalRollup.objects.all()
+        rentals = Rental.objects.filter(end_time__isnull=False).order_by('id')
+        day = None
+        if since is not None:
+            _, day = bucket_starts(since)
+            rollups = rollups.filter(start__gte=day)
+            rentals = rentals.filter(end_time__gte=day)
+        cutoff = timezone.now() - TAIL_MARGIN
+
+        with connection.cursor() as cursor:
+            # A temporary table survives the commits of the batches and
+            # has the unique index the upserts need.
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {shadow} '
+                f'(LIKE {table} INCLUDING DEFAULTS INCLUDING IDENTITY '
+                f'INCLUDING INDEXES)'
+            )
+        try:
+            # The bulk of the history, one commit per batch, while
+            # returns keep adding to the live table.
+            processed = self._add(
+                rentals.filter(end_time__lt=cutoff), day, batch_size
+            )
+
+            with transaction.atomic():
+                # EXCLUSIVE still lets readers see the old buckets, but
+                # waits for returns that already added to them and holds
+                # back new ones. Only the rentals returned since the
+                # cutoff are read under it, then the buckets are copied.
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+                processed += self._add(
+                    rentals.filter(end_time__gte=cutoff), day, batch_size
+                )
+                deleted, _ = rollups.delete()
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {table} ({columns}) '
+                        f'SELECT {columns} FROM {shadow}'
+                    )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {shadow}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Replaced {deleted} buckets from {processed} rentals.'
+            )
+        )
@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals.analytics import MICROSECONDS, utilization
+
+DAY = 86_400 * MICROSECONDS
+
+
+def python_utilization(bicycle_ids, starts, ends):
+    """
+    Per-interval loop the vectorized version replaces, for comparison.
+
+    :return: (peak concurrency, {bicycle_id: busy time})
+    """
+    events = sorted(
+        [(start, 1) for start in starts] + [(end, -1) for end in ends]
+    )
+    level = peak = 0
+    for _, delta in events:
+        level += delta
+        peak = max(peak, level)
+
+    busy = {}
+    reach = {}
+    for bicycle_id, start, end in sorted(zip(bicycle_ids, starts, ends)):
+        start = max(start, reach.get(bicycle_id, start))
+        if end > start:
+            busy[bicycle_id] = busy.get(bicycle_id, 0) + end - start
+            reach[bicycle_id] = end
+    return peak, busy
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the NumPy utilization analytics on synthetic rental '
+        'intervals, against a plain Python loop on a sample.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervals', type=int, default=2_000_000)
+        parser.add_argument('--bicycles', type=int, default=5_000)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--python-sample',
+            type=int,
+            default=200_000,
+            help='Intervals for the Python loop, 0 to skip it.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(
+        self,
+        *args,
+        intervals,
+        bicycles,
+        days,
+        repeat,
+        python_sample,
+        seed,
+        **options,
+    ):
+        rng = np.random.default_rng(seed)
+        window = days * DAY
+        bicycle_ids = rng.integers(1, bicycles + 1, intervals)
+        starts = rng.integers(0, window, intervals)
+        # Rides of 45 minutes on average, cut at the window end so the
+        # unclipped Python loop sees the same intervals.
+        ends = starts + rng.exponential(45 * 60 * MICROSECONDS, intervals)
+        ends = np.minimum(ends.astype(np.int64), window)
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = utilization(bicycle_ids, starts, ends, window)
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        self.stdout.write(
+            f'numpy   {intervals:>10,} intervals  {best * 1000:9.1f} ms  '
+            f'{intervals / best / 1e6:6.2f} M intervals/s  '
+            f'peak {result["peak_concurrency"]}'
+        )
+
+        if python_sample:
+            sample = min(python_sample, intervals)
+            columns = (
+                bicycle_ids[:sample].tolist(),
+                starts[:sample].tolist(),
+                ends[:sample].tolist(),
+            )
+            started = time.perf_counter()
+            peak, busy = python_utilization(*columns)
+            elapsed = time.perf_counter() - started
+            expected = utilization(
+                bicycle_ids[:sample], starts[:sample], ends[:sample], window
+            )
+            # The loop leaves out bicycles without busy time.
+            expected_busy = {
+                bicycle: busy_time
+                for bicycle, busy_time in zip(
+                    expected['bicycles'].tolist(), expected['busy'].tolist()
+                )
+                if busy_time
+            }
+            if peak != expected['peak_concurrency'] or busy != expected_busy:
+                raise CommandError(
+                    'NumPy and Python utilization disagree on the sample.'
+                )
+            rate = sample / elapsed
+            self.stdout.write(
+                f'python  {sample:>10,} intervals  {elapsed * 1000:9.1f} ms  '
+                f'{rate / 1e6:6.2f} M intervals/s'
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Speedup: {intervals / best / rate:.1f}x')
+            )
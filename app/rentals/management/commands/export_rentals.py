@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from common.management.arguments import iso_datetime
+from rentals.export import CHUNK_SIZE, EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream rentals as NDJSON or CSV to stdout or a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            choices=sorted(EXPORT_FORMATS),
+            default='ndjson',
+            help='Export format.',
+        )
+        parser.add_argument(
+            '--since',
+            type=iso_datetime,
+            help='Only rentals started at or after this ISO 8601 datetime.',
+        )
+        parser.add_argument(
+            '--until',
+            type=iso_datetime,
+            help='Only rentals started before this ISO 8601 datetime.',
+        )
+        parser.add_argument(
+            '--file',
+            help='Write to this path instead of stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Rows fetched from the server-side cursor per round trip.',
+        )
+
+    def handle(self, *args, output, since, until, file, chunk_size, **options):
+        lines = iter_export(output, since, until, chunk_size)
+        if file is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(file, 'w', newline='') as stream:
+            stream.writelines(lines)
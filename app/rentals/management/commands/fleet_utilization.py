@@ -0,0 +1,75 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from common.management.arguments import iso_datetime
+from rentals.analytics import fleet_utilization
+
+
+class Command(BaseCommand):
+    help = (
+        "Report fleet utilization, peak concurrency and idle gaps "
+        "over a time window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=iso_datetime,
+            help='Window start, ISO 8601. Default: 7 days before --until.',
+        )
+        parser.add_argument(
+            '--until',
+            type=iso_datetime,
+            help='Window end, ISO 8601. Default: now.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Most and least used bicycles to list.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the full report as JSON.',
+        )
+
+    def handle(self, *args, since, until, top, **options):
+        until = until or timezone.now()
+        since = since or until - timedelta(days=7)
+        report = fleet_utilization(since, until)
+        if options['json']:
+            self.stdout.write(
+                json.dumps(report, cls=DjangoJSONEncoder, indent=2)
+            )
+            return
+
+        gaps = report['idle_gaps']
+        self.stdout.write(
+            f"{report['since']:%Y-%m-%d %H:%M} - "
+            f"{report['until']:%Y-%m-%d %H:%M}: "
+            f"{report['rentals']} rentals, "
+            f"{len(report['bicycles'])} bicycles\n"
+            f"utilization {report['utilization']}%, "
+            f"peak concurrency {report['peak_concurrency']} "
+            f"at {report['peak_at']}, "
+            f"mean concurrency {report['mean_concurrency']}\n"
+            f"idle gaps: {gaps['count']}, "
+            f"p50 {gaps['p50_seconds']}s, p90 {gaps['p90_seconds']}s, "
+            f"p99 {gaps['p99_seconds']}s"
+        )
+        bicycles = report['bicycles']
+        for title, rows in (
+            ('Most used', bicycles[:top]),
+            ('Least used', bicycles[-top:][::-1]),
+        ):
+            self.stdout.write(f'\n{title}:')
+            for row in rows:
+                self.stdout.write(
+                    f"  #{row['bicycle']}: {row['utilization']}% "
+                    f"({row['rentals']} rentals)"
+                )
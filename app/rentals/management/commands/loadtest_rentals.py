@@ -0,0 +1,156 @@
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from bicycles.cache import invalidate_available
+from bicycles.models import Bicycle
+from common.benchmark import request, summarize
+
+User = get_user_model()
+
+SEED_MODEL = 'loadtest'
+ENDPOINTS = ('register', 'token', 'available', 'create', 'return')
+
+
+class Rider:
+    """
+    One simulated client: registers, logs in, then rents and returns
+    bicycles in a loop, recording every request it makes.
+    """
+
+    def __init__(self, base_url, email, results):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.results = results
+        self.headers = {'Content-Type': 'application/json'}
+
+    def call(self, endpoint, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        status, seconds, body = request(
+            method, self.base_url + path, self.headers, data
+        )
+        self.results[endpoint].append((status, seconds))
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+    def run(self, cycles):
+        credentials = {'email': self.email, 'password': 'Loadtest-pass-1'}
+        self.call(
+            'register',
+            'POST',
+            '/api/v1/users/register/',
+            dict(credentials, name='Rider'),
+        )
+        status, body = self.call(
+            'token', 'POST', '/api/v1/users/token/', credentials
+        )
+        if status != 200:
+            return
+        self.headers['Authorization'] = f'Bearer {body["access"]}'
+
+        for _ in range(cycles):
+            status, body = self.call(
+                'available', 'GET', '/api/v1/bicycles/available/'
+            )
+            if status != 200 or not body['results']:
+                continue
+            bicycle = random.choice(body['results'])
+            status, body = self.call(
+                'create',
+                'POST',
+                '/api/v1/rentals/create/',
+                {'bicycle': bicycle['id']},
+            )
+            if status != 201:
+                continue
+            self.call('return', 'PATCH', f'/api/v1/rentals/{body["id"]}/', {})
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive register, token, available, rental create and return with '
+        'concurrent simulated riders against a running server and report '
+        'latency percentiles, throughput and error/conflict rates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--riders', type=int, default=20)
+        parser.add_argument(
+            '--cycles', type=int, default=10, help='Rentals per rider.'
+        )
+        parser.add_argument(
+            '--seed-bicycles',
+            type=int,
+            default=0,
+            help='Create this many available bicycles before the run.',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the riders and seeded bicycles afterwards.',
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='Print the report as JSON.'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed_bicycles']:
+            Bicycle.objects.bulk_create(
+                Bicycle(model=SEED_MODEL, price='100.00')
+                for _ in range(options['seed_bicycles'])
+            )
+            # bulk_create sends no signals.
+            invalidate_available()
+
+        run_id = uuid.uuid4().hex[:8]
+        results = defaultdict(list)
+        riders = [
+            Rider(
+                options['url'], f'rider-{run_id}-{i}@loadtest.local', results
+            )
+            for i in range(options['riders'])
+        ]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(riders)) as pool:
+            for future in [
+                pool.submit(rider.run, options['cycles']) for rider in riders
+            ]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        report = {
+            endpoint: summarize(results[endpoint], elapsed)
+            for endpoint in ENDPOINTS
+        }
+
+        if options['cleanup']:
+            User.objects.filter(email__startswith=f'rider-{run_id}-').delete()
+            Bicycle.objects.filter(model=SEED_MODEL).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f'{"endpoint":<10} {"requests":>8} {"rps":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"errors":>7} {"conflicts":>9}'
+        )
+        for endpoint, stats in report.items():
+            total = stats['requests'] or 1
+            self.stdout.write(
+                f'{endpoint:<10} {stats["requests"]:>8} {stats["rps"]:>8.1f} '
+                f'{stats["p50_ms"]:>8.2f} {stats["p95_ms"]:>8.2f} '
+                f'{stats["p99_ms"]:>8.2f} '
+                f'{stats["errors"] / total:>7.1%} '
+                f'{stats["conflicts"] / total:>9.1%}'
+            )
+        self.stdout.write(f'Finished in {elapsed:.1f} s')
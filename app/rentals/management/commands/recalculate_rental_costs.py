@@ -0,0 +1,100 @@
+from functools import partial
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+)
+from django.db.models.functions import Cast
+
+from rentals import pricing
+from rentals.cache import invalidate_history
+from rentals.models import Rental
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute total_cost of finished rentals from their bicycle's "
+        "current price, in vectorized batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+            help='Rentals read and written per batch.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rentals would change.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        queryset = (
+            Rental.objects.filter(end_time__isnull=False)
+            .annotate(
+                duration=ExpressionWrapper(
+                    F('end_time') - F('start_time'),
+                    output_field=DurationField(),
+                ),
+                price_cents=Cast(F('bicycle__price') * 100, BigIntegerField()),
+                cost_cents=Cast(F('total_cost') * 100, BigIntegerField()),
+            )
+            .order_by('id')
+        )
+
+        last_id = 0
+        processed = changed = 0
+        while True:
+            # Keyset pagination by id: every batch is an index range scan.
+            rows = list(
+                queryset.filter(id__gt=last_id).values_list(
+                    'id', 'renter_id', 'duration', 'price_cents', 'cost_cents'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            ids, renter_ids, durations, prices, costs = zip(*rows)
+            last_id = ids[-1]
+
+            duration_us = np.array(durations, dtype='timedelta64[us]')
+            new_costs = pricing.batch_cost_cents(
+                duration_us.astype(np.int64), np.array(prices)
+            )
+            stale = np.flatnonzero(new_costs != np.array(costs))
+
+            processed += len(rows)
+            changed += len(stale)
+            if stale.size and not dry_run:
+                with transaction.atomic():
+                    Rental.objects.bulk_update(
+                        [
+                            Rental(
+                                id=ids[i],
+                                total_cost=pricing.from_cents(new_costs[i]),
+                            )
+                            for i in stale
+                        ],
+                        ['total_cost'],
+                        batch_size=1_000,
+                    )
+                    # bulk_update sends no signals.
+                    transaction.on_commit(
+                        partial(
+                            invalidate_history,
+                            *{renter_ids[i] for i in stale},
+                        )
+                    )
+
+        verb = 'would change' if dry_run else 'changed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {processed} rentals, {verb} {changed}.'
+            )
+        )
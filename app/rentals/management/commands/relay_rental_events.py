@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rentals.outbox import RELAY_BATCH_SIZE, relay_rental_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Publish the rental events outbox to its Redis stream. Runs once '
+        'by default; with --follow it keeps relaying, in place of the '
+        'Celery beat task.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RELAY_BATCH_SIZE,
+            help='Events published per transaction.',
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Keep relaying until interrupted.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.RENTAL_EVENTS_RELAY_INTERVAL,
+            help='Seconds to wait after an empty run with --follow.',
+        )
+
+    def handle(self, *args, batch_size, follow, interval, **options):
+        while True:
+            published = relay_rental_events(batch_size)
+            if published or not follow:
+                self.stdout.write(f'Published {published} rental events.')
+            if not follow:
+                return
+            if not published:
+                time.sleep(interval)
@@ -0,0 +1,186 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connections, models
+from django.utils import timezone
+
+# Rows per INSERT, keeps the statement under Postgres' parameter limit.
+UPSERT_CHUNK_SIZE = 1000
+
+
+def bucket_starts(end_time):
+    """
+    :param end_time: return time of a rental
+    :return: starts of its hour and day buckets, in local time
+    """
+    hour = timezone.localtime(end_time).replace(
+        minute=0, second=0, microsecond=0
+    )
+    return hour, hour.replace(hour=0)
+
+
+def _next_hour(start):
+    # In absolute time, so DST changes give 23 or 25 hour buckets a day.
+    return timezone.localtime(start + timedelta(hours=1)).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def _next_day(start):
+    return timezone.make_aware(
+        datetime.combine(start.date() + timedelta(days=1), time.min)
+    )
+
+
+def split_ride(start_time, end_time):
+    """
+    Spread a ride over the hour and day buckets it overlaps.
+
+    Each bucket gets the part of ``[start_time, end_time)`` inside it.
+    Seconds are rounded on the cumulative offsets from ``start_time``,
+    so the parts always add up to the rounded duration.
+
+    :return: ``(hour_parts, day_parts)``, lists of
+        (bucket start, seconds) pairs in time order
+    """
+    first_hour, first_day = bucket_starts(start_time)
+    parts = []
+    for start, following in (
+        (first_hour, _next_hour),
+        (first_day, _next_day),
+    ):
+        spans = []
+        done = 0
+        while start < end_time:
+            end = min(following(start), end_time)
+            offset = round((end - start_time).total_seconds())
+            spans.append((start, offset - done))
+            done = offset
+            start = following(start)
+        parts.append(spans)
+    return parts[0], parts[1]
+
+
+class RentalRollupQuerySet(models.QuerySet):
+    def increment(self, rentals, since=None, table=None):
+        """
+        Add returned rentals to the hour and day buckets.
+
+        Rentals are summed per bucket in Python first and then added
+        with one ``INSERT ... ON CONFLICT DO UPDATE`` per chunk, so a
+        bucket row is never read back and concurrent returns just add
+        up. The ridden seconds of a rental are split over every bucket
+        the ride overlaps; the rental itself and its revenue count
+        towards the buckets of its ``end_time``, when it was charged.
+
+        :param rentals: iterable of
+            (bicycle_id, start_time, end_time, total_cost) tuples
+        :param since: leave out ridden time before this bucket start,
+            used by partial rebuilds that keep the older buckets
+        :param table: table with the same columns to add to instead,
+            used by rebuilds into a shadow table
+        :return: number of touched bucket rows
+        """
+        model = self.model
+        totals = defaultdict(lambda: [0, 0, Decimal(0)])
+        for bicycle_id, start_time, end_time, total_cost in rentals:
+            hour, day = bucket_starts(end_time)
+            for period, start in (
+                (model.Period.HOUR, hour),
+                (model.Period.DAY, day),
+            ):
+                bucket = totals[bicycle_id, period, start]
+                bucket[0] += 1
+                bucket[2] += total_cost
+            if since is not None:
+                start_time = max(start_time, since)
+            hour_parts, day_parts = split_ride(start_time, end_time)
+            for period, parts in (
+                (model.Period.HOUR, hour_parts),
+                (model.Period.DAY, day_parts),
+            ):
+                for start, seconds in parts:
+                    totals[bicycle_id, period, start][1] += seconds
+
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(table or model._meta.db_table)
+        fields = [
+            model._meta.get_field(name)
+            for name in (
+                'bicycle',
+                'period',
+                'start',
+                'rentals',
+                'ridden_seconds',
+                'revenue',
+            )
+        ]
+        columns = [quote(field.column) for field in fields]
+        placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+        sql = (
+            'INSERT INTO {table} ({columns}) VALUES {{values}} '
+            'ON CONFLICT ({key}) DO UPDATE SET {updates}'
+        ).format(
+            table=table,
+            columns=', '.join(columns),
+            key=', '.join(columns[:3]),
+            updates=', '.join(
+                f'{column} = {table}.{column} + EXCLUDED.{column}'
+                for column in columns[3:]
+            ),
+        )
+
+        rows = [
+            [
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, (*key, *values))
+            ]
+            for key, values in totals.items()
+        ]
+        with connection.cursor() as cursor:
+            for first in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                last = first + UPSERT_CHUNK_SIZE
+                chunk = rows[first:last]
+                cursor.execute(
+                    sql.format(values=', '.join([placeholders] * len(chunk))),
+                    [param for row in chunk for param in row],
+                )
+        return len(rows)
+
+
+RentalRollupManager = models.Manager.from_queryset(RentalRollupQuerySet)
+
+
+class RentalEventQuerySet(models.QuerySet):
+    def record(self, event_type, rentals):
+        """
+        Write state-change events of rentals to the outbox.
+
+        Call it inside the transaction that changes the rentals, so the
+        events are committed exactly when the change is.
+
+        :param event_type: one of ``RentalEvent.Type``
+        :param rentals: Rental instances after the change
+        :return: the created events
+        """
+        return self.bulk_create(
+            self.model(
+                type=event_type,
+                rental_id=rental.pk,
+                payload={
+                    'id': rental.pk,
+                    'bicycle': rental.bicycle_id,
+                    'renter': str(rental.renter_id),
+                    'start_time': rental.start_time,
+                    'end_time': rental.end_time,
+                    'total_cost': rental.total_cost,
+                    'auto_closed': rental.auto_closed,
+                },
+            )
+            for rental in rentals
+        )
+
+
+RentalEventManager = models.Manager.from_queryset(RentalEventQuerySet)
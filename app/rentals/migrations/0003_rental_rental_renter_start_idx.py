@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0003_bicycle_bicycle_available_idx'),
+        ('rentals', '0002_rental_is_returned'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(
+                fields=['renter', '-start_time', '-id'],
+                name='rental_renter_start_idx',
+            ),
+        ),
+    ]
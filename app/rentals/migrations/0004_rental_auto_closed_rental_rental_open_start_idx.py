@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0003_bicycle_bicycle_available_idx'),
+        ('rentals', '0003_rental_rental_renter_start_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rental',
+            name='auto_closed',
+            field=models.BooleanField(
+                default=False,
+                help_text='Closed by the overdue sweep instead of by the renter.',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(
+                fields=['is_returned', 'start_time'],
+                name='rental_open_start_idx',
+            ),
+        ),
+    ]
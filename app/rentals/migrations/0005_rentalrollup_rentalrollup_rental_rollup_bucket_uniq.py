@@ -0,0 +1,68 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0003_bicycle_bicycle_available_idx'),
+        ('rentals', '0004_rental_auto_closed_rental_rental_open_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalRollup',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'period',
+                    models.CharField(
+                        choices=[('hour', 'Hour'), ('day', 'Day')],
+                        max_length=4,
+                    ),
+                ),
+                ('start', models.DateTimeField()),
+                ('rentals', models.PositiveIntegerField(default=0)),
+                ('ridden_seconds', models.PositiveBigIntegerField(default=0)),
+                (
+                    'revenue',
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14
+                    ),
+                ),
+                (
+                    'bicycle',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='rollups',
+                        to='bicycles.bicycle',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['period', 'start'],
+                        name='rental_rollup_period_idx',
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rentalrollup',
+            constraint=models.UniqueConstraint(
+                fields=('bicycle', 'period', 'start'),
+                name='rental_rollup_bucket_uniq',
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bicycles', '0004_bicycle_model_trgm_idx'),
+        (
+            'rentals',
+            '0005_rentalrollup_rentalrollup_rental_rollup_bucket_uniq',
+        ),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['start_time'], name='rental_start_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:51
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0006_rental_rental_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalEvent',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'type',
+                    models.CharField(
+                        choices=[
+                            ('rental.started', 'Rental started'),
+                            ('rental.returned', 'Rental returned'),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ('rental_id', models.BigIntegerField()),
+                (
+                    'payload',
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+    ]
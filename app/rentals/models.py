@@ -1,11 +1,14 @@
-from decimal import Decimal
-
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from common.metrics import RENTALS_RETURNED
+from rentals import pricing
+from rentals.managers import RentalEventManager, RentalRollupManager
+
 User = get_user_model()
 
 
@@ -22,12 +25,34 @@ class Rental(models.Model):
         max_digits=10, decimal_places=2, default=0.00
     )
     is_returned = models.BooleanField(default=False)
+    auto_closed = models.BooleanField(
+        default=False,
+        help_text='Closed by the overdue sweep instead of by the renter.',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['renter', '-start_time', '-id'],
+                name='rental_renter_start_idx',
+            ),
+            models.Index(
+                fields=['is_returned', 'start_time'],
+                name='rental_open_start_idx',
+            ),
+            # Min/max and ranges for the admin date hierarchy.
+            models.Index(fields=['start_time'], name='rental_start_idx'),
+        ]
 
     def calculate_cost(self):
         if self.start_time and self.end_time:
-            duration = (self.end_time - self.start_time).total_seconds()
-            cost_per_second = float(self.bicycle.price) / 3600
-            self.total_cost = Decimal(round(duration * cost_per_second, 2))
+            duration = pricing.duration_microseconds(
+                self.end_time - self.start_time
+            )
+            cost = pricing.cost_cents(
+                duration, pricing.to_cents(self.bicycle.price)
+            )
+            self.total_cost = pricing.from_cents(cost)
 
     def save(self, *args, **kwargs):
         if self.end_time:
@@ -46,12 +71,99 @@ class Rental(models.Model):
             )
 
     def return_bicycle(self):
-        if not self.is_returned:
+        """
+        Finish the rental and free its bicycle.
+
+        Writes only the finalized columns of both rows, the rollups and
+        the ``rental.returned`` outbox event in one transaction. Load
+        the rental with ``select_related('bicycle')`` to avoid an extra
+        query for the price.
+        """
+        if self.is_returned:
+            return
+        with transaction.atomic(savepoint=False):
             self.end_time = timezone.now()
             self.is_returned = True
+            self.save(update_fields=['end_time', 'total_cost', 'is_returned'])
             self.bicycle.in_rent = False
-            self.save()
-            self.bicycle.save()
+            self.bicycle.save(update_fields=['in_rent', 'updated_at'])
+            RentalEvent.objects.record(RentalEvent.Type.RETURNED, [self])
+            RentalRollup.objects.increment(
+                [
+                    (
+                        self.bicycle_id,
+                        self.start_time,
+                        self.end_time,
+                        self.total_cost,
+                    )
+                ]
+            )
+            transaction.on_commit(RENTALS_RETURNED.inc)
 
     def __str__(self):
         return f"{self.bicycle} by {self.renter}"
+
+
+class RentalRollup(models.Model):
+    """
+    Rentals, ridden time and revenue of one bicycle per hour or day.
+
+    Kept up to date by ``Rental.return_bicycle`` and the overdue sweep,
+    rebuilt with the ``backfill_rental_rollups`` command.
+    """
+
+    class Period(models.TextChoices):
+        HOUR = 'hour', _('Hour')
+        DAY = 'day', _('Day')
+
+    bicycle = models.ForeignKey(
+        "bicycles.Bicycle", related_name='rollups', on_delete=models.CASCADE
+    )
+    period = models.CharField(max_length=4, choices=Period.choices)
+    start = models.DateTimeField()
+    rentals = models.PositiveIntegerField(default=0)
+    ridden_seconds = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = RentalRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bicycle', 'period', 'start'],
+                name='rental_rollup_bucket_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', 'start'], name='rental_rollup_period_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bicycle} {self.period} {self.start:%Y-%m-%d %H:%M}"
+
+
+class RentalEvent(models.Model):
+    """
+    Transactional outbox of rental state changes.
+
+    Rows are written in the transaction of the change and removed once
+    ``rentals.outbox.relay_rental_events`` has published them to the
+    rental events Redis stream.
+    """
+
+    class Type(models.TextChoices):
+        STARTED = 'rental.started', _('Rental started')
+        RETURNED = 'rental.returned', _('Rental returned')
+
+    type = models.CharField(max_length=32, choices=Type.choices)
+    # Not a foreign key: the event outlives a deleted rental.
+    rental_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = RentalEventManager()
+
+    def __str__(self):
+        return f"{self.type} #{self.rental_id}"
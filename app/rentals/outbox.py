@@ -0,0 +1,87 @@
+import json
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from rentals.models import RentalEvent
+
+RELAY_BATCH_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def get_events_redis():
+    return redis.Redis.from_url(settings.RENTAL_EVENTS_REDIS_URL)
+
+
+def ensure_consumer_groups(client=None):
+    """
+    Create the consumer groups of ``RENTAL_EVENTS_CONSUMER_GROUPS`` on
+    the rental events stream, creating the stream if needed.
+
+    A new group starts at the beginning of the stream, so it also gets
+    the events published before it existed and not yet trimmed.
+    """
+    client = client or get_events_redis()
+    for group in settings.RENTAL_EVENTS_CONSUMER_GROUPS:
+        try:
+            client.xgroup_create(
+                settings.RENTAL_EVENTS_STREAM, group, id='0', mkstream=True
+            )
+        except redis.ResponseError as exc:
+            if not str(exc).startswith('BUSYGROUP'):
+                raise
+
+
+def relay_rental_events(batch_size=RELAY_BATCH_SIZE):
+    """
+    Publish the outbox to the rental events stream, oldest first.
+
+    Each batch is claimed with ``SKIP LOCKED``, so several relays can
+    run side by side; events are then ordered within a batch, not
+    across batches. A batch is sent in one pipeline of ``XADD`` commands
+    and deleted in the same transaction that claimed it. When the
+    delete does not commit, the batch is published again by the next
+    run: delivery is at least once, and consumers deduplicate by the
+    ``event_id`` field.
+
+    :return: number of published events
+    """
+    client = get_events_redis()
+    ensure_consumer_groups(client)
+    published = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                RentalEvent.objects.select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list(
+                    'id', 'type', 'rental_id', 'payload', 'created_at'
+                )[:batch_size]
+            )
+            if not events:
+                break
+            pipeline = client.pipeline(transaction=False)
+            for event_id, event_type, rental_id, payload, created_at in events:
+                pipeline.xadd(
+                    settings.RENTAL_EVENTS_STREAM,
+                    {
+                        'event_id': event_id,
+                        'type': event_type,
+                        'rental_id': rental_id,
+                        'payload': json.dumps(payload, cls=DjangoJSONEncoder),
+                        'created_at': created_at.isoformat(),
+                    },
+                    maxlen=settings.RENTAL_EVENTS_STREAM_MAXLEN,
+                    approximate=True,
+                )
+            pipeline.execute()
+            RentalEvent.objects.filter(
+                pk__in=[event[0] for event in events]
+            ).delete()
+        published += len(events)
+        if len(events) < batch_size:
+            break
+    return published
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RentalHistoryPagination(CursorPagination):
+    # Matches the (renter, -start_time, -id) index, so every page is an
+    # index range scan no matter how long the history is.
+    ordering = ('-start_time', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -10,4 +10,4 @@ class IsRentalOwnerOrSuperuser(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.renter == request.user or request.user.is_superuser
+        return obj.renter_id == request.user.pk or request.user.is_superuser
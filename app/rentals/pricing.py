@@ -0,0 +1,61 @@
+"""
+Rental pricing in integer minor units (cents).
+
+Prices are per hour and durations are in microseconds, so every cost is
+computed exactly and rounded once, half up, to a whole cent. The scalar
+and the NumPy functions give identical results.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+MICROSECONDS_PER_HOUR = 3_600_000_000
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def duration_microseconds(delta):
+    return (
+        delta.days * 86_400_000_000
+        + delta.seconds * 1_000_000
+        + delta.microseconds
+    )
+
+
+def cost_cents(duration_us, price_cents):
+    """
+    Cost of a rental.
+
+    :param duration_us: rental duration in microseconds
+    :param price_cents: hourly price in cents
+    :return: cost in cents
+    """
+    hours, remainder = divmod(max(duration_us, 0), MICROSECONDS_PER_HOUR)
+    fraction = (2 * price_cents * remainder + MICROSECONDS_PER_HOUR) // (
+        2 * MICROSECONDS_PER_HOUR
+    )
+    return price_cents * hours + fraction
+
+
+def batch_cost_cents(duration_us, price_cents):
+    """
+    Vectorized ``cost_cents`` over int64 arrays.
+
+    Whole hours and the remainder are priced separately, which keeps
+    every intermediate product well inside int64 for any price the
+    ``Bicycle.price`` column can hold.
+    """
+    duration_us = np.maximum(np.asarray(duration_us, dtype=np.int64), 0)
+    price_cents = np.asarray(price_cents, dtype=np.int64)
+    hours, remainder = np.divmod(duration_us, MICROSECONDS_PER_HOUR)
+    fraction = (2 * price_cents * remainder + MICROSECONDS_PER_HOUR) // (
+        2 * MICROSECONDS_PER_HOUR
+    )
+    return price_cents * hours + fraction
@@ -9,4 +9,24 @@ class RentalSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Rental
-        fields = ('bicycle', 'renter', 'start_time', 'end_time', 'total_cost')
+        fields = (
+            'id',
+            'bicycle',
+            'renter',
+            'start_time',
+            'end_time',
+            'total_cost',
+        )
+
+
+class RentalRollupBucketSerializer(serializers.Serializer):
+    """
+    One bucket of the rollups, summed over the selected bicycles.
+    """
+
+    start = serializers.DateTimeField()
+    rentals = serializers.IntegerField(source='total_rentals')
+    ridden_seconds = serializers.IntegerField(source='total_ridden_seconds')
+    revenue = serializers.DecimalField(
+        max_digits=14, decimal_places=2, source='total_revenue'
+    )
@@ -0,0 +1,14 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rentals.cache import invalidate_history
+from rentals.models import Rental
+
+
+@receiver(post_save, sender=Rental)
+@receiver(post_delete, sender=Rental)
+def invalidate_rental_history(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_history, instance.renter_id))
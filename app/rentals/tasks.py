@@ -0,0 +1,108 @@
+from functools import partial
+
+import numpy as np
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from bicycles.models import Bicycle
+from rentals import pricing
+from rentals.cache import invalidate_history
+from rentals.models import Rental, RentalEvent, RentalRollup
+from rentals.outbox import relay_rental_events
+
+SWEEP_BATCH_SIZE = 500
+
+
+def close_overdue_rentals(older_than, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Close every rental still open since before ``older_than``.
+
+    Works through the (is_returned, start_time) index one batch per
+    transaction. Only the rows of the current batch are locked, and
+    rows a renter is returning right now are skipped, not waited for.
+
+    :return: number of closed rentals
+    """
+    closed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Rental.objects.filter(
+                    is_returned=False, start_time__lt=older_than
+                )
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('start_time')
+                .values_list(
+                    'id',
+                    'start_time',
+                    'bicycle_id',
+                    'bicycle__price',
+                    'renter_id',
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            ids, start_times, bicycle_ids, prices, renter_ids = zip(*rows)
+
+            end_time = timezone.now()
+            costs = pricing.batch_cost_cents(
+                [
+                    pricing.duration_microseconds(end_time - start_time)
+                    for start_time in start_times
+                ],
+                np.array([pricing.to_cents(price) for price in prices]),
+            )
+            closed_rentals = [
+                Rental(
+                    id=rental_id,
+                    bicycle_id=bicycle_id,
+                    renter_id=renter_id,
+                    start_time=start_time,
+                    end_time=end_time,
+                    total_cost=pricing.from_cents(cost),
+                    is_returned=True,
+                    auto_closed=True,
+                )
+                for rental_id, bicycle_id, renter_id, start_time, cost in zip(
+                    ids, bicycle_ids, renter_ids, start_times, costs
+                )
+            ]
+            Rental.objects.bulk_update(
+                closed_rentals,
+                ['end_time', 'total_cost', 'is_returned', 'auto_closed'],
+            )
+            RentalEvent.objects.record(
+                RentalEvent.Type.RETURNED, closed_rentals
+            )
+            RentalRollup.objects.increment(
+                (
+                    rental.bicycle_id,
+                    rental.start_time,
+                    rental.end_time,
+                    rental.total_cost,
+                )
+                for rental in closed_rentals
+            )
+            Bicycle.objects.filter(pk__in=bicycle_ids).set_in_rent(False)
+            # bulk_update sends no signals.
+            transaction.on_commit(
+                partial(invalidate_history, *set(renter_ids))
+            )
+        closed += len(rows)
+        if len(rows) < batch_size:
+            break
+    return closed
+
+
+@shared_task(ignore_result=True)
+def sweep_overdue_rentals():
+    return close_overdue_rentals(
+        timezone.now() - settings.RENTAL_OVERDUE_AFTER
+    )
+
+
+@shared_task(ignore_result=True)
+def relay_rental_events_task():
+    return relay_rental_events()
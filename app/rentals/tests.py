@@ -1,15 +1,43 @@
+import csv
+import json
+import threading
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+import redis
 from django.contrib.admin import AdminSite
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import (
+    LiveServerTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from .admin import RentalAdmin
-from .models import Rental
+from . import pricing
+from .analytics import utilization
+from .admin import BicycleIdFilter, RentalAdmin, RenterFilter
+from .management.commands.benchmark_utilization import (
+    python_utilization,
+)
+from .managers import bucket_starts
+from .models import Rental, RentalEvent, RentalRollup
+from .outbox import get_events_redis, relay_rental_events
 from bicycles.models import Bicycle
 
 from .serializers import RentalSerializer
+from .tasks import close_overdue_rentals, sweep_overdue_rentals
 
 User = get_user_model()
 
@@ -75,6 +103,22 @@ class RentalModelTests(TestCase):
         self.assertIsNotNone(rental.end_time)
         self.assertFalse(rental.bicycle.in_rent)
 
+    def test_rental_return_bicycle_queries(self):
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(in_rent=True)
+        rental = Rental.objects.create(bicycle=self.bicycle, renter=self.user)
+        rental = Rental.objects.select_related('bicycle').get(pk=rental.pk)
+
+        # One UPDATE for the rental, one for the bicycle, one upsert for
+        # the rollups, one INSERT for the outbox event.
+        with self.assertNumQueries(4):
+            rental.return_bicycle()
+
+        rental.refresh_from_db()
+        self.bicycle.refresh_from_db()
+        self.assertTrue(rental.is_returned)
+        self.assertIsNotNone(rental.end_time)
+        self.assertFalse(self.bicycle.in_rent)
+
     def test_rental_permission_to_return_not_returned(self):
         rental = Rental.objects.create(
             bicycle=self.bicycle, renter=self.user, is_returned=False
@@ -94,6 +138,645 @@ class RentalModelTests(TestCase):
         self.assertTrue(rental.is_returned)
 
 
+class PricingTests(TestCase):
+
+    def test_cost_rounds_half_up_to_cent(self):
+        # 15 seconds at 1.00/h is exactly 0.4166.. cents, 18 is 0.5
+        self.assertEqual(pricing.cost_cents(15_000_000, 100), 0)
+        self.assertEqual(pricing.cost_cents(18_000_000, 100), 1)
+
+    def test_cost_is_exact(self):
+        duration = pricing.duration_microseconds(
+            timezone.timedelta(hours=3, minutes=20)
+        )
+        self.assertEqual(pricing.cost_cents(duration, 1999), 6663)
+        self.assertEqual(pricing.from_cents(6663), Decimal('66.63'))
+        self.assertEqual(pricing.to_cents(Decimal('19.99')), 1999)
+
+    def test_negative_duration_costs_nothing(self):
+        self.assertEqual(pricing.cost_cents(-1, 1000), 0)
+
+    def test_batch_matches_scalar(self):
+        rng = np.random.default_rng(0)
+        durations = rng.integers(-(10**6), 400 * 24 * 3600 * 10**6, 1000)
+        prices = rng.integers(1, 99_999_999, 1000)
+        durations[0], prices[0] = 365 * 24 * 3600 * 10**6 - 1, 99_999_999
+
+        costs = pricing.batch_cost_cents(durations, prices)
+
+        self.assertEqual(
+            costs.tolist(),
+            [
+                pricing.cost_cents(int(d), int(p))
+                for d, p in zip(durations, prices)
+            ],
+        )
+
+
+class RecalculateRentalCostsCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price=Decimal('10.00')
+        )
+        start_time = timezone.now() - timezone.timedelta(days=1)
+        self.rentals = [
+            Rental.objects.create(
+                bicycle=self.bicycle,
+                renter=self.user,
+                start_time=start_time,
+                end_time=start_time + timezone.timedelta(minutes=90 * i),
+            )
+            for i in range(1, 4)
+        ]
+        self.open_rental = Rental.objects.create(
+            bicycle=self.bicycle, renter=self.user
+        )
+
+    def test_recalculates_after_price_change(self):
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(price='20.00')
+        out = StringIO()
+
+        call_command('recalculate_rental_costs', batch_size=2, stdout=out)
+
+        self.assertIn('Processed 3 rentals, changed 3.', out.getvalue())
+        self.assertEqual(
+            [
+                rental.total_cost
+                for rental in Rental.objects.filter(
+                    end_time__isnull=False
+                ).order_by('id')
+            ],
+            [Decimal('30.00'), Decimal('60.00'), Decimal('90.00')],
+        )
+        self.open_rental.refresh_from_db()
+        self.assertEqual(self.open_rental.total_cost, 0)
+
+    def test_dry_run(self):
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(price='20.00')
+        out = StringIO()
+
+        call_command('recalculate_rental_costs', dry_run=True, stdout=out)
+
+        self.assertIn('would change 3', out.getvalue())
+        self.rentals[0].refresh_from_db()
+        self.assertEqual(self.rentals[0].total_cost, Decimal('15.00'))
+
+
+class OverdueSweepTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.overdue = []
+        for i in range(3):
+            bicycle = Bicycle.objects.create(
+                model=f'Overdue {i}', price=Decimal('10.00'), in_rent=True
+            )
+            rental = Rental.objects.create(bicycle=bicycle, renter=self.user)
+            Rental.objects.filter(pk=rental.pk).update(
+                start_time=timezone.now() - timezone.timedelta(days=2)
+            )
+            self.overdue.append(rental)
+        self.fresh_bicycle = Bicycle.objects.create(
+            model='Fresh', price=Decimal('10.00'), in_rent=True
+        )
+        self.fresh = Rental.objects.create(
+            bicycle=self.fresh_bicycle, renter=self.user
+        )
+
+    def test_closes_overdue_in_batches(self):
+        cutoff = timezone.now() - timezone.timedelta(days=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            closed = close_overdue_rentals(cutoff, batch_size=2)
+
+        self.assertEqual(closed, 3)
+        for rental in self.overdue:
+            rental.refresh_from_db()
+            self.assertTrue(rental.is_returned)
+            self.assertTrue(rental.auto_closed)
+            # Two days at 10.00 per hour.
+            self.assertGreaterEqual(rental.total_cost, Decimal('480.00'))
+            self.assertFalse(Bicycle.objects.get(pk=rental.bicycle_id).in_rent)
+        self.fresh.refresh_from_db()
+        self.assertFalse(self.fresh.is_returned)
+        self.fresh_bicycle.refresh_from_db()
+        self.assertTrue(self.fresh_bicycle.in_rent)
+
+    def test_task_uses_overdue_setting(self):
+        with self.settings(RENTAL_OVERDUE_AFTER=timezone.timedelta(days=3)):
+            sweep_overdue_rentals.apply()
+        self.assertFalse(Rental.objects.filter(auto_closed=True).exists())
+
+        sweep_overdue_rentals.apply()
+        self.assertEqual(Rental.objects.filter(auto_closed=True).count(), 3)
+
+
+@override_settings(
+    RENTAL_EVENTS_STREAM='test:rentals:events',
+    RENTAL_EVENTS_CONSUMER_GROUPS=['billing', 'fleet-ops'],
+)
+class RentalEventOutboxTests(TestCase):
+
+    def setUp(self):
+        self.redis = get_events_redis()
+        self.redis.delete('test:rentals:events')
+        self.addCleanup(self.redis.delete, 'test:rentals:events')
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='password'
+        )
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def rent(self):
+        return self.client.post(
+            reverse('rental-create'), {'bicycle': self.bicycle.id}
+        )
+
+    def test_create_and_return_record_events(self):
+        rental_id = self.rent().data['id']
+        self.client.patch(reverse('rental-detail', args=[rental_id]))
+
+        events = list(RentalEvent.objects.order_by('id'))
+        self.assertEqual(
+            [(event.type, event.rental_id) for event in events],
+            [
+                (RentalEvent.Type.STARTED, rental_id),
+                (RentalEvent.Type.RETURNED, rental_id),
+            ],
+        )
+        self.assertEqual(events[1].payload['total_cost'], '0.00')
+        self.assertEqual(events[1].payload['renter'], str(self.user.pk))
+
+    def test_failed_create_records_nothing(self):
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(in_rent=True)
+
+        self.assertEqual(self.rent().status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(RentalEvent.objects.exists())
+
+    def test_sweep_records_events(self):
+        self.rent()
+        RentalEvent.objects.all().delete()
+
+        close_overdue_rentals(timezone.now())
+
+        event = RentalEvent.objects.get()
+        self.assertEqual(event.type, RentalEvent.Type.RETURNED)
+        self.assertTrue(event.payload['auto_closed'])
+
+    def test_relay_publishes_to_consumer_groups(self):
+        rental_id = self.rent().data['id']
+        self.client.patch(reverse('rental-detail', args=[rental_id]))
+
+        self.assertEqual(relay_rental_events(batch_size=1), 2)
+        self.assertEqual(relay_rental_events(), 0)
+
+        self.assertFalse(RentalEvent.objects.exists())
+        for group in ('billing', 'fleet-ops'):
+            [(_, messages)] = self.redis.xreadgroup(
+                group, 'test', {'test:rentals:events': '>'}
+            )
+            self.assertEqual(
+                [fields[b'type'] for _, fields in messages],
+                [b'rental.started', b'rental.returned'],
+            )
+        payload = json.loads(messages[0][1][b'payload'])
+        self.assertEqual(payload['id'], rental_id)
+
+    def test_relay_keeps_events_when_redis_fails(self):
+        self.rent()
+
+        with mock.patch.object(
+            redis.client.Pipeline,
+            'execute',
+            side_effect=redis.ConnectionError,
+        ):
+            with self.assertRaises(redis.ConnectionError):
+                relay_rental_events()
+
+        self.assertEqual(RentalEvent.objects.count(), 1)
+        self.assertEqual(relay_rental_events(), 1)
+
+    def test_relay_command(self):
+        self.rent()
+        out = StringIO()
+
+        call_command('relay_rental_events', stdout=out)
+
+        self.assertIn('Published 1 rental events.', out.getvalue())
+
+
+class RentalRollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price=Decimal('10.00')
+        )
+
+    def rent(self, minutes, bicycle=None):
+        rental = Rental.objects.create(
+            bicycle=bicycle or self.bicycle,
+            renter=self.user,
+            start_time=timezone.now() - timezone.timedelta(minutes=minutes),
+        )
+        rental.return_bicycle()
+        return rental
+
+    def buckets(self):
+        return list(
+            RentalRollup.objects.order_by(
+                'bicycle', 'period', 'start'
+            ).values_list(
+                'bicycle', 'period', 'start', 'rentals', 'ridden_seconds'
+            )
+        )
+
+    def local(self, *args):
+        return timezone.make_aware(timezone.datetime(*args))
+
+    def test_return_splits_ride_over_hours(self):
+        # 08:35 to 10:05: charged at 10:05, ridden in three hours.
+        end_time = self.local(2024, 5, 6, 10, 5)
+        with mock.patch('rentals.models.timezone.now', return_value=end_time):
+            rental = self.rent(90)
+
+        hours = RentalRollup.objects.filter(
+            period=RentalRollup.Period.HOUR
+        ).order_by('start')
+        self.assertEqual(
+            [
+                (bucket.start, bucket.rentals, bucket.ridden_seconds)
+                for bucket in hours
+            ],
+            [
+                (self.local(2024, 5, 6, 8), 0, 25 * 60),
+                (self.local(2024, 5, 6, 9), 0, 60 * 60),
+                (self.local(2024, 5, 6, 10), 1, 5 * 60),
+            ],
+        )
+        self.assertEqual(hours[2].revenue, rental.total_cost)
+        day = RentalRollup.objects.get(period=RentalRollup.Period.DAY)
+        self.assertEqual(day.start, self.local(2024, 5, 6))
+        self.assertEqual(day.rentals, 1)
+        self.assertEqual(day.ridden_seconds, 90 * 60)
+        self.assertEqual(day.revenue, rental.total_cost)
+
+    def test_ride_over_midnight_splits_days(self):
+        RentalRollup.objects.increment(
+            [
+                (
+                    self.bicycle.id,
+                    self.local(2024, 5, 6, 23, 30),
+                    self.local(2024, 5, 7, 0, 45),
+                    Decimal('12.50'),
+                )
+            ]
+        )
+
+        days = RentalRollup.objects.filter(
+            period=RentalRollup.Period.DAY
+        ).order_by('start')
+        self.assertEqual(
+            [
+                (bucket.start, bucket.rentals, bucket.ridden_seconds)
+                for bucket in days
+            ],
+            [
+                (self.local(2024, 5, 6), 0, 30 * 60),
+                (self.local(2024, 5, 7), 1, 45 * 60),
+            ],
+        )
+        self.assertEqual(days[1].revenue, Decimal('12.50'))
+
+    def test_backfill_matches_incremental(self):
+        other = Bicycle.objects.create(model='Other', price=Decimal('5.00'))
+        self.rent(10)
+        self.rent(200)
+        self.rent(45, bicycle=other)
+        Rental.objects.create(bicycle=other, renter=self.user)
+        incremental = self.buckets()
+        RentalRollup.objects.all().delete()
+        out = StringIO()
+
+        call_command('backfill_rental_rollups', batch_size=2, stdout=out)
+
+        self.assertEqual(self.buckets(), incremental)
+        self.assertIn('from 3 rentals', out.getvalue())
+
+    def test_backfill_keeps_returns_during_rebuild(self):
+        Rental.objects.create(
+            bicycle=self.bicycle,
+            renter=self.user,
+            start_time=timezone.now() - timezone.timedelta(hours=3),
+            end_time=timezone.now() - timezone.timedelta(hours=2),
+        )
+        increment = RentalRollup.objects.increment
+        returned = []
+
+        def increment_during_return(*args, **kwargs):
+            # A renter returns while the history is being rebuilt.
+            if not returned:
+                returned.append(True)
+                self.rent(30)
+            return increment(*args, **kwargs)
+
+        with mock.patch.object(
+            RentalRollup.objects,
+            'increment',
+            side_effect=increment_during_return,
+        ):
+            call_command('backfill_rental_rollups', stdout=StringIO())
+        rebuilt = self.buckets()
+        call_command('backfill_rental_rollups', stdout=StringIO())
+
+        self.assertEqual(rebuilt, self.buckets())
+        self.assertEqual(
+            RentalRollup.objects.filter(
+                period=RentalRollup.Period.DAY
+            ).aggregate(Sum('rentals'))['rentals__sum'],
+            2,
+        )
+
+    def test_backfill_since_keeps_older_buckets(self):
+        old = Rental.objects.create(
+            bicycle=self.bicycle,
+            renter=self.user,
+            start_time=timezone.now() - timezone.timedelta(days=10, hours=1),
+            end_time=timezone.now() - timezone.timedelta(days=10),
+        )
+        call_command('backfill_rental_rollups', stdout=StringIO())
+        self.rent(30)
+        Rental.objects.filter(pk=old.pk).update(total_cost=0)
+
+        call_command(
+            'backfill_rental_rollups',
+            since=timezone.now() - timezone.timedelta(days=1),
+            stdout=StringIO(),
+        )
+
+        oldest = RentalRollup.objects.earliest('start')
+        self.assertEqual(oldest.revenue, Decimal('10.00'))
+        recent = RentalRollup.objects.filter(
+            period=RentalRollup.Period.HOUR,
+            start__gte=timezone.now() - timezone.timedelta(hours=2),
+        ).aggregate(Sum('ridden_seconds'))
+        self.assertEqual(recent['ridden_seconds__sum'], 30 * 60)
+
+    def test_backfill_since_clips_rides_into_kept_buckets(self):
+        # Started two days ago: the part before --since stays in the
+        # kept buckets and must not be added again.
+        self.rent(2 * 24 * 60)
+        incremental = self.buckets()
+
+        call_command(
+            'backfill_rental_rollups',
+            since=timezone.now() - timezone.timedelta(days=1),
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(self.buckets(), incremental)
+
+    def test_sweep_adds_to_rollups(self):
+        rental = Rental.objects.create(
+            bicycle=self.bicycle,
+            renter=self.user,
+            start_time=timezone.now() - timezone.timedelta(days=2),
+        )
+
+        close_overdue_rentals(timezone.now() - timezone.timedelta(days=1))
+
+        rental.refresh_from_db()
+        _, return_day = bucket_starts(rental.end_time)
+        day = RentalRollup.objects.get(
+            period=RentalRollup.Period.DAY, start=return_day
+        )
+        self.assertEqual(day.rentals, 1)
+        self.assertEqual(day.revenue, rental.total_cost)
+        self.assertEqual(
+            RentalRollup.objects.filter(
+                period=RentalRollup.Period.DAY
+            ).aggregate(Sum('ridden_seconds'))['ridden_seconds__sum'],
+            round((rental.end_time - rental.start_time).total_seconds()),
+        )
+
+
+class RentalAnalyticsAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='testpass123'
+        )
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+        self.bicycles = [
+            Bicycle.objects.create(model=f'Bike {i}', price=Decimal('10.00'))
+            for i in range(2)
+        ]
+        for bicycle in self.bicycles:
+            rental = Rental.objects.create(
+                bicycle=bicycle,
+                renter=self.user,
+                start_time=timezone.now() - timezone.timedelta(hours=1),
+            )
+            rental.return_bicycle()
+        self.url = reverse('rental-analytics')
+
+    def test_sums_over_bicycles(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['period'], 'day')
+        # A ride across midnight is split over two days.
+        buckets = response.data['results']
+        self.assertEqual(sum(bucket['rentals'] for bucket in buckets), 2)
+        self.assertEqual(
+            sum(bucket['ridden_seconds'] for bucket in buckets), 2 * 3600
+        )
+        self.assertEqual(buckets[-1]['revenue'], '20.00')
+
+    def test_filters(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(
+            self.url, {'period': 'hour', 'bicycle': self.bicycles[0].pk}
+        )
+        buckets = response.data['results']
+        self.assertEqual(sum(bucket['rentals'] for bucket in buckets), 1)
+        self.assertEqual(
+            sum(bucket['ridden_seconds'] for bucket in buckets), 3600
+        )
+
+        response = self.client.get(
+            self.url, {'since': timezone.now().isoformat()}
+        )
+        self.assertEqual(response.data['results'], [])
+
+        for params in ({'period': 'week'}, {'bicycle': 'x'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UtilizationTests(TestCase):
+
+    def test_small_fleet(self):
+        result = utilization(
+            np.array([7, 7, 7, 3, 3]),
+            np.array([0, 10, 15, 5, 60]),
+            np.array([10, 20, 30, 30, 200]),
+            100,
+        )
+
+        self.assertEqual(result['bicycles'].tolist(), [3, 7])
+        # Bicycle 3 is clipped at the window end, bicycle 7 overlaps
+        # itself from 15 to 20.
+        self.assertEqual(result['busy'].tolist(), [65, 30])
+        self.assertEqual(result['rentals'].tolist(), [2, 3])
+        # 10 is both an end and a start: back-to-back, not overlapping.
+        self.assertEqual(result['peak_concurrency'], 3)
+        self.assertEqual(result['peak_at'], 15)
+        self.assertEqual(result['idle_gaps'].tolist(), [30])
+
+    def test_empty(self):
+        empty = np.empty(0, dtype=np.int64)
+        result = utilization(empty, empty, empty, 100)
+        self.assertEqual(result['peak_concurrency'], 0)
+        self.assertIsNone(result['peak_at'])
+        self.assertEqual(len(result['busy']), 0)
+
+    def test_long_window(self):
+        # Bicycle times a window this long overflowed a combined sort key
+        window = 2**62
+        result = utilization(
+            np.array([1, 3, 3]),
+            np.array([0, window // 4, window // 2]),
+            np.array([window, window, window]),
+            window,
+        )
+
+        self.assertEqual(result['busy'].tolist(), [window, window // 4 * 3])
+
+    def test_matches_python_loop(self):
+        rng = np.random.default_rng(1)
+        bicycle_ids = rng.integers(1, 50, 5000)
+        starts = rng.integers(0, 10_000, 5000)
+        ends = starts + rng.integers(0, 500, 5000)
+
+        result = utilization(bicycle_ids, starts, ends, 20_000)
+        peak, busy = python_utilization(
+            bicycle_ids.tolist(), starts.tolist(), ends.tolist()
+        )
+
+        self.assertEqual(result['peak_concurrency'], peak)
+        self.assertEqual(
+            dict(zip(result['bicycles'].tolist(), result['busy'].tolist())),
+            busy,
+        )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_utilization',
+            intervals=1000,
+            python_sample=100,
+            repeat=1,
+            stdout=out,
+        )
+        self.assertIn('Speedup', out.getvalue())
+
+
+class FleetUtilizationTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='testpass123'
+        )
+        self.until = timezone.now().replace(microsecond=0)
+        self.since = self.until - timezone.timedelta(hours=10)
+        self.busy = Bicycle.objects.create(model='Busy', price='10.00')
+        self.idle = Bicycle.objects.create(model='Idle', price='10.00')
+        for start, end in ((-2, 3), (4, 6), (8, None)):
+            Rental.objects.create(
+                bicycle=self.busy,
+                renter=self.admin,
+                start_time=self.since + timezone.timedelta(hours=start),
+                end_time=(
+                    self.since + timezone.timedelta(hours=end)
+                    if end is not None
+                    else None
+                ),
+            )
+        self.url = reverse('rental-utilization')
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.get(
+            self.url,
+            {'since': self.since.isoformat(), 'until': self.until.isoformat()},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['rentals'], 3)
+        self.assertEqual(data['peak_concurrency'], 1)
+        # Clipped to 3 + 2 + 2 of 10 hours; the idle bicycle scores 0.
+        self.assertEqual(
+            [(row['bicycle'], row['utilization']) for row in data['bicycles']],
+            [(self.busy.pk, 70.0), (self.idle.pk, 0.0)],
+        )
+        self.assertEqual(data['utilization'], 35.0)
+        self.assertEqual(data['idle_gaps']['count'], 2)
+        self.assertEqual(data['idle_gaps']['p50_seconds'], 5400.0)
+
+    def test_endpoint_validation(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(
+            self.url,
+            {'since': self.until.isoformat(), 'until': self.since.isoformat()},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        client.force_authenticate(
+            User.objects.create_user(email='u@example.com', password='x')
+        )
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'fleet_utilization',
+            since=self.since,
+            until=self.until,
+            json=True,
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['bicycles'][0]['busy_seconds'], 7 * 3600)
+
+        out = StringIO()
+        call_command(
+            'fleet_utilization', since=self.since, until=self.until, stdout=out
+        )
+        self.assertIn('utilization 35.0%', out.getvalue())
+
+
 class RentalAdminTest(TestCase):
 
     def setUp(self):
@@ -123,14 +806,47 @@ class RentalAdminTest(TestCase):
         self.assertEqual(self.rental_admin.list_display, expected_list_display)
 
     def test_list_filter(self):
+        # Bicycles and renters are typed in, never listed one by one.
         expected_list_filter = (
-            'bicycle',
-            'renter',
-            'start_time',
+            BicycleIdFilter,
+            RenterFilter,
             'end_time',
             'is_returned',
+            'auto_closed',
         )
         self.assertEqual(self.rental_admin.list_filter, expected_list_filter)
+        self.assertEqual(self.rental_admin.date_hierarchy, 'start_time')
+        self.assertEqual(
+            self.rental_admin.list_select_related, ('bicycle', 'renter')
+        )
+
+    def test_changelist_filters(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', password='password'
+        )
+        other = Rental.objects.create(
+            bicycle=Bicycle.objects.create(model='Other', price='10.00'),
+            renter=admin,
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:rentals_rental_changelist')
+
+        for params, expected in (
+            ({}, {self.rental, other}),
+            ({'bicycle': self.bicycle.pk}, {self.rental}),
+            ({'bicycle': 'x'}, set()),
+            ({'renter': 'admin@example.com'}, {other}),
+            ({'renter': str(self.user.pk)}, {self.rental}),
+            ({'renter': 'nobody'}, set()),
+            ({'q': 'Other'}, {other}),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    set(response.context['cl'].result_list), expected
+                )
+        self.assertContains(response, 'name="renter"')
 
     def test_readonly_fields(self):
         expected_readonly_fields = ('total_cost',)
@@ -163,3 +879,555 @@ class RentalSerializerTest(TestCase):
         updated_rental = serializer.save()
 
         self.assertEqual(updated_rental.end_time, data['end_time'])
+
+
+class RentalCreateAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='password'
+        )
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00'
+        )
+        self.url = reverse('rental-create')
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_rental_claims_bicycle(self):
+        response = self.client.post(
+            self.url, {'bicycle': self.bicycle.id}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.bicycle.refresh_from_db()
+        self.assertTrue(self.bicycle.in_rent)
+        rental = Rental.objects.get()
+        self.assertEqual(rental.renter, self.user)
+
+    def test_create_rental_for_rented_bicycle(self):
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(in_rent=True)
+
+        response = self.client.post(
+            self.url, {'bicycle': self.bicycle.id}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Rental.objects.exists())
+
+    def test_create_rental_replayed_with_idempotency_key(self):
+        payload = {'bicycle': self.bicycle.id}
+        first = self.client.post(
+            self.url, payload, format='json', HTTP_IDEMPOTENCY_KEY='retry-1'
+        )
+
+        with self.assertNumQueries(0):
+            replay = self.client.post(
+                self.url,
+                payload,
+                format='json',
+                HTTP_IDEMPOTENCY_KEY='retry-1',
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Rental.objects.count(), 1)
+
+    def test_create_rental_idempotency_key_reused(self):
+        other_bicycle = Bicycle.objects.create(
+            model='Other Bicycle', price='20.00'
+        )
+        self.client.post(
+            self.url,
+            {'bicycle': self.bicycle.id},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY='retry-1',
+        )
+
+        response = self.client.post(
+            self.url,
+            {'bicycle': other_bicycle.id},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY='retry-1',
+        )
+
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Rental.objects.count(), 1)
+
+    def test_create_rental_idempotency_key_per_user(self):
+        self.client.post(
+            self.url,
+            {'bicycle': self.bicycle.id},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY='retry-1',
+        )
+        other_user = User.objects.create_user(
+            email='other@example.com', password='password'
+        )
+        self.client.force_authenticate(user=other_user)
+
+        response = self.client.post(
+            self.url,
+            {'bicycle': self.bicycle.id},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY='retry-1',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+
+class RentalDetailAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='password'
+        )
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00', in_rent=True
+        )
+        self.rental = Rental.objects.create(
+            bicycle=self.bicycle,
+            renter=self.user,
+            start_time=timezone.now() - timezone.timedelta(hours=1),
+        )
+        self.url = reverse('rental-detail', args=[self.rental.pk])
+        self.client.force_authenticate(user=self.user)
+
+    def test_return_rental(self):
+        response = self.client.patch(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.rental.refresh_from_db()
+        self.bicycle.refresh_from_db()
+        self.assertTrue(self.rental.is_returned)
+        self.assertIsNotNone(self.rental.end_time)
+        self.assertEqual(self.rental.total_cost, Decimal('10.00'))
+        self.assertFalse(self.bicycle.in_rent)
+        self.assertEqual(response.data['total_cost'], '10.00')
+
+    def test_retrieve_rental_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.rental.id)
+
+    def test_retrieve_foreign_rental(self):
+        other_user = User.objects.create_user(
+            email='other@example.com', password='password'
+        )
+        self.client.force_authenticate(user=other_user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_foreign_rental_as_superuser(self):
+        superuser = User.objects.create_superuser(
+            email='admin@example.com', password='password'
+        )
+        self.client.force_authenticate(user=superuser)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_return_rental_queries(self):
+        # Savepoint, locking SELECT of the rental with its bicycle,
+        # two UPDATEs, the rollup upsert, the outbox event, release.
+        with self.assertNumQueries(7):
+            response = self.client.patch(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_return_rental_ignores_payload(self):
+        other_bicycle = Bicycle.objects.create(
+            model='Other Bicycle', price='20.00'
+        )
+
+        response = self.client.patch(
+            self.url, {'bicycle': other_bicycle.pk}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.bicycle, self.bicycle)
+
+    def test_return_returned_rental(self):
+        self.rental.return_bicycle()
+
+        response = self.client.patch(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_return_rental_replayed_with_idempotency_key(self):
+        first = self.client.patch(
+            self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='return-1'
+        )
+
+        with self.assertNumQueries(0):
+            replay = self.client.patch(
+                self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='return-1'
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.data, first.data)
+
+    def test_return_rental_invalid_idempotency_key(self):
+        response = self.client.patch(
+            self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='x' * 256
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.rental.refresh_from_db()
+        self.assertFalse(self.rental.is_returned)
+
+
+class RentalHistoryAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='password'
+        )
+        other_user = User.objects.create_user(
+            email='other@example.com', password='password'
+        )
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00'
+        )
+        now = timezone.now()
+        self.rentals = [
+            Rental.objects.create(
+                bicycle=self.bicycle,
+                renter=self.user,
+                start_time=now - timezone.timedelta(days=i),
+                is_returned=i > 0,
+            )
+            for i in range(5)
+        ]
+        Rental.objects.create(bicycle=self.bicycle, renter=other_user)
+        self.url = reverse('rental-history')
+        self.client.force_authenticate(user=self.user)
+
+    def _collect_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_history_cursor_pagination(self):
+        ids = self._collect_ids(self.url + '?page_size=2')
+
+        self.assertEqual(ids, [rental.id for rental in self.rentals])
+
+    def test_history_filters(self):
+        since = (self.rentals[3].start_time).isoformat()
+        until = (self.rentals[0].start_time).isoformat()
+        response = self.client.get(
+            self.url,
+            {'since': since, 'until': until, 'is_returned': 'true'},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [rental.id for rental in self.rentals[1:4]],
+        )
+
+    def test_history_async(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        url = reverse('rental-history-async') + '?page_size=2'
+
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+
+        self.assertEqual(ids, [rental.id for rental in self.rentals])
+
+    def test_history_async_filters(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        url = reverse('rental-history-async')
+
+        response = self.client.get(url, {'is_returned': 'false'})
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [self.rentals[0].id],
+        )
+
+        response = self.client.get(url, {'is_returned': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_history_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('private', response['Cache-Control'])
+
+        other_user = User.objects.get(email='other@example.com')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rentals[0].return_bicycle()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_history_not_modified_after_sweep(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            close_overdue_rentals(timezone.now())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['id'], self.rentals[0].id)
+        self.assertIsNotNone(response.data['results'][0]['end_time'])
+
+    def test_history_not_modified_after_recalculation(self):
+        rental = self.rentals[1]
+        Rental.objects.filter(pk=rental.pk).update(
+            end_time=rental.start_time + timezone.timedelta(hours=1)
+        )
+        etag = self.client.get(self.url)['ETag']
+        Bicycle.objects.filter(pk=self.bicycle.pk).update(price='20.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recalculate_rental_costs', stdout=StringIO())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][1]['total_cost'], '20.00')
+
+    def test_history_invalid_filters(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'is_returned': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RentalExportTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_superuser(
+            email='admin@example.com', password='password'
+        )
+        self.user = User.objects.create_user(
+            email='test@example.com', password='password'
+        )
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00'
+        )
+        now = timezone.now()
+        self.rentals = [
+            Rental.objects.create(
+                bicycle=self.bicycle,
+                renter=self.user,
+                start_time=now - timezone.timedelta(days=i),
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('rental-export')
+
+    def test_export_ndjson(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            sorted(rental.id for rental in self.rentals),
+        )
+        self.assertEqual(rows[0]['renter_id'], str(self.user.id))
+
+    def test_export_csv_with_date_range(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(
+            self.url,
+            {
+                'output': 'csv',
+                'since': self.rentals[1].start_time.isoformat(),
+                'until': self.rentals[0].start_time.isoformat(),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(
+            [int(row['id']) for row in rows], [self.rentals[1].id]
+        )
+        self.assertEqual(rows[0]['total_cost'], '0.00')
+
+    def test_export_invalid_output(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url, {'output': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_staff_only(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        out = StringIO()
+
+        call_command(
+            'export_rentals',
+            '--output=csv',
+            f'--since={self.rentals[1].start_time.isoformat()}',
+            stdout=out,
+        )
+
+        rows = list(csv.DictReader(out.getvalue().splitlines()))
+        self.assertEqual(
+            sorted(int(row['id']) for row in rows),
+            sorted(rental.id for rental in self.rentals[:2]),
+        )
+
+
+class RentalCreateConcurrencyTest(TransactionTestCase):
+    riders = 8
+
+    def setUp(self):
+        self.bicycle = Bicycle.objects.create(
+            model='Test Bicycle', price='10.00'
+        )
+        self.users = [
+            User.objects.create_user(
+                email=f'rider{i}@example.com', password='password'
+            )
+            for i in range(self.riders)
+        ]
+        self.url = reverse('rental-create')
+
+    def test_parallel_create_only_one_wins(self):
+        barrier = threading.Barrier(self.riders)
+        statuses = []
+
+        def rent(user):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            try:
+                barrier.wait()
+                response = client.post(
+                    self.url, {'bicycle': self.bicycle.id}, format='json'
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=rent, args=(user,)) for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(
+            statuses.count(status.HTTP_409_CONFLICT), self.riders - 1
+        )
+        self.assertEqual(Rental.objects.count(), 1)
+        self.bicycle.refresh_from_db()
+        self.assertTrue(self.bicycle.in_rent)
+
+    def test_parallel_duplicates_collapse(self):
+        barrier = threading.Barrier(self.riders)
+        responses = []
+
+        def rent():
+            client = APIClient()
+            client.force_authenticate(user=self.users[0])
+            try:
+                barrier.wait()
+                responses.append(
+                    client.post(
+                        self.url,
+                        {'bicycle': self.bicycle.id},
+                        format='json',
+                        HTTP_IDEMPOTENCY_KEY='parallel-1',
+                    )
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=rent) for _ in range(self.riders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * self.riders,
+        )
+        self.assertEqual(
+            {response.data['id'] for response in responses},
+            {Rental.objects.get().id},
+        )
+
+
+class LoadtestRentalsCommandTest(LiveServerTestCase):
+
+    def test_loadtest_against_live_server(self):
+        out = StringIO()
+
+        call_command(
+            'loadtest_rentals',
+            url=self.live_server_url,
+            riders=2,
+            cycles=2,
+            seed_bicycles=5,
+            cleanup=True,
+            json=True,
+            stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['register']['requests'], 2)
+        self.assertEqual(report['token']['requests'], 2)
+        self.assertEqual(report['available']['requests'], 4)
+        self.assertEqual(
+            report['create']['requests'] - report['create']['conflicts'],
+            report['return']['requests'],
+        )
+        for stats in report.values():
+            self.assertEqual(stats['errors'], 0)
+        self.assertFalse(Bicycle.objects.exists())
@@ -1,12 +1,32 @@
 from django.urls import path
 from .views import (
+    RentalAnalyticsAPIView,
     RentalCreateAPIView,
     RentalDetailAPIView,
+    RentalExportAPIView,
     RentalHistoryAPIView,
+    RentalUtilizationAPIView,
+    rental_history_async,
 )
 
 urlpatterns = [
     path('<int:pk>/', RentalDetailAPIView.as_view(), name='rental-detail'),
     path('history/', RentalHistoryAPIView.as_view(), name='rental-history'),
+    path(
+        'history/async/',
+        rental_history_async,
+        name='rental-history-async',
+    ),
     path('create/', RentalCreateAPIView.as_view(), name='rental-create'),
+    path('export/', RentalExportAPIView.as_view(), name='rental-export'),
+    path(
+        'analytics/',
+        RentalAnalyticsAPIView.as_view(),
+        name='rental-analytics',
+    ),
+    path(
+        'utilization/',
+        RentalUtilizationAPIView.as_view(),
+        name='rental-utilization',
+    ),
 ]
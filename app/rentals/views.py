@@ -1,9 +1,70 @@
-from django.core.exceptions import ValidationError
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from .models import Rental
+from rest_framework.views import APIView
+
+from bicycles.models import Bicycle
+from common import keyset
+from common.conditional import ConditionalListMixin
+from common.idempotency import idempotent
+from common.metrics import RENTALS_STARTED
+from common.throttling import UserTokenBucketThrottle
+from users.authentication import async_jwt_required
+from .analytics import fleet_utilization
+from .cache import history_version
+from .exceptions import BicycleAlreadyRented
+from .export import EXPORT_FORMATS, iter_export
+from .models import Rental, RentalEvent, RentalRollup
+from .pagination import RentalHistoryPagination
 from .permissions import IsRentalOwnerOrSuperuser
-from .serializers import RentalSerializer
+from .serializers import RentalRollupBucketSerializer, RentalSerializer
+
+
+def parse_datetime_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Expected an ISO 8601 datetime.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_history(queryset, params):
+    """
+    Apply the optional ``since``/``until``/``is_returned`` filters of
+    the history endpoints.
+
+    :raises ValidationError: on a malformed filter value
+    """
+    since = parse_datetime_param(params, 'since')
+    if since is not None:
+        queryset = queryset.filter(start_time__gte=since)
+    until = parse_datetime_param(params, 'until')
+    if until is not None:
+        queryset = queryset.filter(start_time__lt=until)
+
+    is_returned = params.get('is_returned')
+    if is_returned is not None:
+        if is_returned.lower() not in ('true', 'false', '1', '0'):
+            raise ValidationError({'is_returned': 'Expected true or false.'})
+        queryset = queryset.filter(
+            is_returned=is_returned.lower() in ('true', '1')
+        )
+    return queryset
 
 
 class RentalCreateAPIView(generics.CreateAPIView):
@@ -12,20 +73,29 @@ class RentalCreateAPIView(generics.CreateAPIView):
         permissions.IsAuthenticated,
         IsRentalOwnerOrSuperuser,
     ]
+    throttle_classes = [UserTokenBucketThrottle]
+    throttle_scope = 'rentals-create'
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         bicycle_instance = serializer.validated_data.get('bicycle')
 
-        if bicycle_instance.in_rent:
-            raise ValidationError("This bicycle is already rented.")
-
-        serializer.save(renter=self.request.user)
-        bicycle_instance.in_rent = True
-        bicycle_instance.save()
+        # Claim the bicycle and insert the rental and its outbox event
+        # in one transaction: a lost claim leaves nothing behind, a
+        # failed insert frees it.
+        with transaction.atomic():
+            if not Bicycle.objects.claim(bicycle_instance.pk):
+                raise BicycleAlreadyRented()
+            rental = serializer.save(renter=self.request.user)
+            RentalEvent.objects.record(RentalEvent.Type.STARTED, [rental])
+            transaction.on_commit(RENTALS_STARTED.inc)
 
 
 class RentalDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Rental.objects.all()
+    queryset = Rental.objects.select_related('bicycle')
     serializer_class = RentalSerializer
     permission_classes = [
         permissions.IsAuthenticated,
@@ -33,31 +103,202 @@ class RentalDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     ]
     http_method_names = ['get', 'patch']
 
-    def patch(self, request, *args, **kwargs):
-        instance = self.get_object()
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(renter=self.request.user)
+        if self.request.method == 'PATCH':
+            # Lock the rental row so concurrent returns are serialized.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
 
-        if instance.is_returned:
-            return Response(
-                {"error": "Cannot finish a returned rental."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
+    @idempotent
+    def patch(self, request, *args, **kwargs):
+        with transaction.atomic():
+            instance = self.get_object()
 
-        serializer = self.get_serializer(
-            instance, data=request.data, partial=True
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+            if instance.is_returned:
+                return Response(
+                    {"error": "Cannot finish a returned rental."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
 
-        instance.return_bicycle()
-        instance.save()
+            instance.return_bicycle()
 
+        serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
 
-class RentalHistoryAPIView(generics.ListAPIView):
+class RentalHistoryAPIView(ConditionalListMixin, generics.ListAPIView):
+    """
+    Rentals of the current user, newest first.
+
+    Optional query params: ``since`` and ``until`` (ISO 8601, bound
+    ``start_time``) and ``is_returned`` (true/false). Pages carry an
+    ETag from the user's history version and are answered with 304
+    while it is unchanged.
+    """
+
     serializer_class = RentalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RentalHistoryPagination
+
+    def get_list_version(self, request):
+        return request.user.pk, history_version(request.user.pk)
 
     def get_queryset(self):
-        user = self.request.user
-        return Rental.objects.filter(renter=user)
+        if getattr(self, 'swagger_fake_view', False):
+            return Rental.objects.none()
+        return filter_history(
+            Rental.objects.filter(renter=self.request.user),
+            self.request.query_params,
+        )
+
+
+class RentalExportAPIView(APIView):
+    """
+    Stream all rentals as NDJSON (default) or CSV.
+
+    Query params: ``output`` (ndjson/csv), ``since`` and ``until``
+    (ISO 8601, bound ``start_time``).
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        output = params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'output': f'Expected one of: {", ".join(EXPORT_FORMATS)}.'}
+            )
+        since = parse_datetime_param(params, 'since')
+        until = parse_datetime_param(params, 'until')
+
+        response = StreamingHttpResponse(
+            iter_export(output, since, until),
+            content_type=EXPORT_FORMATS[output],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="rentals.{output}"'
+        )
+        return response
+
+
+class RentalAnalyticsAPIView(APIView):
+    """
+    Rentals, ridden seconds and revenue per hour or day.
+
+    Read from the rollups, so the cost depends on the number of buckets,
+    not on the number of rentals. Query params: ``period`` (hour/day),
+    ``since`` and ``until`` (ISO 8601, bound the bucket start, default
+    the last 48 hours or 30 days) and ``bicycle`` (id).
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    default_range = {
+        RentalRollup.Period.HOUR: timedelta(hours=48),
+        RentalRollup.Period.DAY: timedelta(days=30),
+    }
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        period = params.get('period', RentalRollup.Period.DAY)
+        if period not in RentalRollup.Period.values:
+            raise ValidationError(
+                {
+                    'period': 'Expected one of: {}.'.format(
+                        ', '.join(RentalRollup.Period.values)
+                    )
+                }
+            )
+        until = parse_datetime_param(params, 'until') or timezone.now()
+        since = parse_datetime_param(params, 'since')
+        if since is None:
+            since = until - self.default_range[period]
+
+        queryset = RentalRollup.objects.filter(
+            period=period, start__gte=since, start__lt=until
+        )
+        bicycle = params.get('bicycle')
+        if bicycle is not None:
+            if not bicycle.isdigit():
+                raise ValidationError({'bicycle': 'Expected a bicycle id.'})
+            queryset = queryset.filter(bicycle_id=bicycle)
+
+        buckets = (
+            queryset.values('start')
+            .annotate(
+                total_rentals=Sum('rentals'),
+                total_ridden_seconds=Sum('ridden_seconds'),
+                total_revenue=Sum('revenue'),
+            )
+            .order_by('start')
+        )
+        return Response(
+            {
+                'period': period,
+                'since': since,
+                'until': until,
+                'results': RentalRollupBucketSerializer(
+                    buckets, many=True
+                ).data,
+            }
+        )
+
+
+class RentalUtilizationAPIView(APIView):
+    """
+    Fleet and per-bicycle utilization, peak concurrency and idle gaps.
+
+    Query params: ``since`` and ``until`` (ISO 8601, default the last
+    7 days). Computed from the rental intervals with NumPy.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    default_range = timedelta(days=7)
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        until = parse_datetime_param(params, 'until') or timezone.now()
+        since = parse_datetime_param(params, 'since')
+        if since is None:
+            since = until - self.default_range
+        if since >= until:
+            raise ValidationError({'since': 'Must be before until.'})
+        return Response(fleet_utilization(since, until))
+
+
+@require_GET
+@async_jwt_required
+async def rental_history_async(request):
+    """
+    Async variant of ``RentalHistoryAPIView`` for ASGI workers, paged
+    with a keyset ``cursor`` over the renter/start_time index.
+    """
+    try:
+        page_size = keyset.get_page_size(request.GET)
+        cursor = request.GET.get('cursor')
+        cursor = keyset.decode_cursor(cursor) if cursor else None
+        queryset = filter_history(
+            Rental.objects.filter(renter_id=request.user.pk), request.GET
+        )
+    except ValueError as exc:
+        return JsonResponse({'detail': str(exc)}, status=400)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    queryset = queryset.order_by('-start_time', '-id')
+    if cursor is not None:
+        queryset = queryset.filter(keyset.after_cursor('start_time', cursor))
+    rentals = [
+        rental async for rental in queryset[: page_size + 1].aiterator()
+    ]
+    return JsonResponse(
+        {
+            'next': keyset.next_url(request, rentals, page_size, 'start_time'),
+            'results': RentalSerializer(rentals[:page_size], many=True).data,
+        }
+    )
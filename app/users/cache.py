@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from common.metrics import record_cache
+
+# Redis entries are dropped on change, in-process ones only in the
+# process that made the change: LOCAL_TIMEOUT bounds how long another
+# worker may keep serving a stale user.
+LOCAL_TIMEOUT = 5
+LOCAL_MAXSIZE = 1024
+TIMEOUT = 60
+GENERATION_TIMEOUT = 60 * 60 * 24
+
+# Only what authentication and permissions read; never the password.
+AUTH_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(user_id):
+    return f"users:auth:{user_id}"
+
+
+def _generation_key(user_id):
+    return f"users:auth:{user_id}:generation"
+
+
+def _dump(user):
+    return {field: getattr(user, field) for field in AUTH_FIELDS}
+
+
+def _load(values):
+    # from_db takes the values in model field order. The other fields
+    # are deferred and loaded on first access.
+    model = get_user_model()
+    names = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.attname in values
+    ]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, names, [values[name] for name in names]
+    )
+
+
+def _get_local(key):
+    with _lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+    return values
+
+
+def _set_local(key, values):
+    with _lock:
+        _local[key] = (time.monotonic() + LOCAL_TIMEOUT, values)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAXSIZE:
+            _local.popitem(last=False)
+
+
+def _current(entries, key, generation_key):
+    # An entry written under an older generation raced an invalidation.
+    entry = entries.get(key)
+    if entry is None or entry[0] != entries.get(generation_key):
+        return None
+    return entry[1]
+
+
+def get_user(user_id):
+    """
+    Cached user for the given primary key, or None on a miss.
+
+    Looks in the in-process LRU first, then in Redis. Every call
+    returns a new instance holding only ``AUTH_FIELDS``.
+    """
+    key = _key(user_id)
+    values = _get_local(key)
+    if values is None:
+        generation_key = _generation_key(user_id)
+        entries = cache.get_many([key, generation_key])
+        values = _current(entries, key, generation_key)
+        if values is not None:
+            _set_local(key, values)
+    record_cache("auth_user", values is not None)
+    return None if values is None else _load(values)
+
+
+async def aget_user(user_id):
+    key = _key(user_id)
+    values = _get_local(key)
+    if values is None:
+        generation_key = _generation_key(user_id)
+        entries = await cache.aget_many([key, generation_key])
+        values = _current(entries, key, generation_key)
+        if values is not None:
+            _set_local(key, values)
+    record_cache("auth_user", values is not None)
+    return None if values is None else _load(values)
+
+
+def current_generation(user_id):
+    """
+    Current generation of a user's cache entry, bumped on every change.
+
+    Read it before loading the user from the database and pass it to
+    ``set_user``: if the user changes in between, the entry is written
+    under the old generation and never served. A missing generation is
+    seeded from the clock, so it never repeats an earlier value.
+    """
+    key = _generation_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), GENERATION_TIMEOUT)
+        value = cache.get(key)
+    return value
+
+
+async def acurrent_generation(user_id):
+    key = _generation_key(user_id)
+    value = await cache.aget(key)
+    if value is None:
+        await cache.aadd(key, time.time_ns(), GENERATION_TIMEOUT)
+        value = await cache.aget(key)
+    return value
+
+
+def set_user(user, generation=None):
+    """
+    Cache the authentication fields of ``user``.
+
+    :param generation: generation read before the user was loaded;
+        defaults to the current one
+    """
+    if generation is None:
+        generation = current_generation(user.pk)
+    # The in-process copy is filled from Redis on the next hit, after
+    # the generation has been checked.
+    cache.set(_key(user.pk), (generation, _dump(user)), TIMEOUT)
+
+
+async def aset_user(user, generation=None):
+    if generation is None:
+        generation = await acurrent_generation(user.pk)
+    await cache.aset(_key(user.pk), (generation, _dump(user)), TIMEOUT)
+
+
+def invalidate_user(user_id):
+    key = _key(user_id)
+    with _lock:
+        _local.pop(key, None)
+    generation_key = _generation_key(user_id)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.add(generation_key, time.time_ns(), GENERATION_TIMEOUT)
+    cache.delete(key)
+
+
+def clear_local():
+    with _lock:
+        _local.clear()
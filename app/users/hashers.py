@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def _param(algorithm, name):
+    """
+    Cost parameter read from settings.PASSWORD_HASHER_PARAMS on every use,
+    so changing it makes must_update() rehash on the next login.
+    """
+    return property(
+        lambda self: settings.PASSWORD_HASHER_PARAMS[algorithm][name]
+    )
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = _param("pbkdf2_sha256", "iterations")
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = _param("argon2", "time_cost")
+    memory_cost = _param("argon2", "memory_cost")
+    parallelism = _param("argon2", "parallelism")
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = _param("scrypt", "work_factor")
+    block_size = _param("scrypt", "block_size")
+    parallelism = _param("scrypt", "parallelism")
+    # Upper bound only, nothing is allocated up front. OpenSSL's default of
+    # 32 MiB rejects anything above work_factor 2**14 with block_size 8.
+    maxmem = 1024**3
@@ -0,0 +1,156 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+SAMPLE_PASSWORD = "correct horse battery staple"
+PBKDF2_PROBE_ITERATIONS = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the password hashers on this host and recommend cost "
+        "parameters for a target latency per hash."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250.0,
+            help="Wanted time for a single hash, in milliseconds.",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Hashes per measurement, the median is used.",
+        )
+        parser.add_argument(
+            "--algorithm",
+            action="append",
+            choices=sorted(settings.PASSWORD_HASHER_PARAMS),
+            help="Algorithm to calibrate, can be repeated. Default: all.",
+        )
+        argon2 = settings.PASSWORD_HASHER_PARAMS["argon2"]
+        parser.add_argument(
+            "--argon2-memory-cost",
+            type=int,
+            default=argon2["memory_cost"],
+            help="Fixed Argon2 memory in KiB, time_cost is searched.",
+        )
+        parser.add_argument(
+            "--argon2-parallelism",
+            type=int,
+            default=argon2["parallelism"],
+            help="Fixed Argon2 lanes, time_cost is searched.",
+        )
+
+    def handle(self, *args, target_ms, rounds, algorithm, **options):
+        self.rounds = rounds
+        target = target_ms / 1000
+        calibrations = {
+            "pbkdf2_sha256": self.calibrate_pbkdf2,
+            "argon2": self.calibrate_argon2,
+            "scrypt": self.calibrate_scrypt,
+        }
+        env = []
+        for name in algorithm or calibrations:
+            try:
+                params, seconds = calibrations[name](target, **options)
+            except ValueError as e:
+                # Argon2 without argon2-cffi installed
+                self.stderr.write(f"{name}: skipped, {e}")
+                continue
+            self.stdout.write(
+                "{:<14} {:<50} {:>8.1f} ms {:>6.1f} hashes/s".format(
+                    name,
+                    " ".join(f"{k}={v}" for k, v in params.items()),
+                    seconds * 1000,
+                    1 / seconds,
+                )
+            )
+            if seconds > target:
+                self.stderr.write(
+                    f"{name}: the cheapest setting tried is above the target"
+                )
+            prefix = "PASSWORD_{}_".format(name.split("_")[0].upper())
+            env.extend(f"{prefix}{k.upper()}={v}" for k, v in params.items())
+
+        if env:
+            self.stdout.write("\nSuggested environment:")
+            self.stdout.write("\n".join(env))
+
+    def measure(self, hasher):
+        """
+        :param hasher: configured hasher instance
+        :return: median seconds per hash
+        """
+        salt = hasher.salt()
+        timings = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            hasher.encode(SAMPLE_PASSWORD, salt)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def climb(self, make_hasher, values, target):
+        """
+        Try cost values from cheapest up and keep the last one in target.
+
+        :return: (value, seconds)
+        """
+        best = None
+        for value in values:
+            seconds = self.measure(make_hasher(value))
+            if seconds > target and best is not None:
+                break
+            best = value, seconds
+            if seconds > target:
+                break
+        return best
+
+    def calibrate_pbkdf2(self, target, **options):
+        # PBKDF2 time is linear in iterations, one probe is enough.
+        hasher = hashers.PBKDF2PasswordHasher()
+        hasher.iterations = PBKDF2_PROBE_ITERATIONS
+        seconds = self.measure(hasher)
+        iterations = int(PBKDF2_PROBE_ITERATIONS * target / seconds)
+        hasher.iterations = max(round(iterations, -4), 10_000)
+        return {"iterations": hasher.iterations}, self.measure(hasher)
+
+    def calibrate_argon2(
+        self, target, argon2_memory_cost, argon2_parallelism, **options
+    ):
+        def make_hasher(time_cost):
+            hasher = hashers.Argon2PasswordHasher()
+            hasher.time_cost = time_cost
+            hasher.memory_cost = argon2_memory_cost
+            hasher.parallelism = argon2_parallelism
+            return hasher
+
+        make_hasher(1)._load_library()
+        time_cost, seconds = self.climb(make_hasher, range(1, 11), target)
+        return {
+            "time_cost": time_cost,
+            "memory_cost": argon2_memory_cost,
+            "parallelism": argon2_parallelism,
+        }, seconds
+
+    def calibrate_scrypt(self, target, **options):
+        def make_hasher(work_factor):
+            hasher = hashers.ScryptPasswordHasher()
+            hasher.work_factor = work_factor
+            hasher.maxmem = 1024**3
+            return hasher
+
+        work_factor, seconds = self.climb(
+            make_hasher, [2**k for k in range(14, 21)], target
+        )
+        return {
+            "work_factor": work_factor,
+            "block_size": hashers.ScryptPasswordHasher.block_size,
+            "parallelism": hashers.ScryptPasswordHasher.parallelism,
+        }, seconds
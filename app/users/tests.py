@@ -1,9 +1,21 @@
-from django.test import TestCase, Client
+from io import StringIO
+
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from .cache import (
+    _key,
+    clear_local,
+    current_generation,
+    get_user,
+    invalidate_user,
+    set_user,
+)
 from .serializers import UserSerializer
 
 
@@ -234,3 +246,197 @@ class UserSerializerTests(TestCase):
         self.assertIn('email', serializer.errors)
         self.assertIn('password', serializer.errors)
         self.assertIn('name', serializer.errors)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123', name='Test User'
+        )
+        response = self.client.post(
+            reverse('token-obtain-pair'),
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            format='json',
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+
+    def test_user_resolved_from_cache(self):
+        """Test that only the first request loads the user from the db"""
+        url = reverse('user-me')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['email'], 'test@example.com')
+
+    def test_user_resolved_from_redis(self):
+        """Test that another process finds the user in redis"""
+        url = reverse('user-me')
+        self.client.get(url)
+        clear_local()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_invalidated_on_update(self):
+        """Test that an update through the API refreshes the cache"""
+        url = reverse('user-me')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('user-update'),
+                {'email': 'new@example.com'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['email'], 'new@example.com')
+
+    def test_cache_invalidated_on_deactivation(self):
+        """Test that a deactivated user is rejected right away"""
+        url = reverse('user-me')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_write_not_served(self):
+        """Test that a user loaded before a change is not cached after it"""
+        generation = current_generation(self.user.pk)
+        stale = User.objects.get(pk=self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        invalidate_user(self.user.pk)
+
+        set_user(stale, generation)
+
+        self.assertIsNone(get_user(self.user.pk))
+        response = self.client.get(reverse('user-me'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_not_cached(self):
+        """Test that only the authentication fields reach redis"""
+        self.client.get(reverse('user-me'))
+
+        _, values = cache.get(_key(self.user.pk))
+        self.assertNotIn(self.user.password, values.values())
+        user = get_user(self.user.pk)
+        self.assertEqual(user.email, 'test@example.com')
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_me_async(self):
+        """Test the async 'me' endpoint resolves the user from the cache"""
+        url = reverse('user-me-async')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'email': 'test@example.com'})
+
+    def test_me_async_unauthenticated(self):
+        """Test the async 'me' endpoint rejects missing and bad tokens"""
+        url = reverse('user-me-async')
+        client = APIClient()
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+        client.credentials(HTTP_AUTHORIZATION='Bearer garbage')
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+PBKDF2_ONLY = ['users.hashers.PBKDF2PasswordHasher']
+FAST_PARAMS = {
+    'pbkdf2_sha256': {'iterations': 1000},
+    'argon2': {'time_cost': 1, 'memory_cost': 1024, 'parallelism': 1},
+    'scrypt': {'work_factor': 1024, 'block_size': 8, 'parallelism': 1},
+}
+
+
+@override_settings(PASSWORD_HASHER_PARAMS=FAST_PARAMS)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123'
+        )
+
+    def login(self):
+        return self.client.post(
+            reverse('token-obtain-pair'),
+            {'email': 'test@example.com', 'password': 'testpass123'},
+        )
+
+    def test_uses_configured_cost(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_rehash_on_login_after_cost_change(self):
+        params = {**FAST_PARAMS, 'pbkdf2_sha256': {'iterations': 2000}}
+        with self.settings(PASSWORD_HASHER_PARAMS=params):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_rehash_on_login_after_algorithm_change(self):
+        hashers = [
+            'users.hashers.Argon2PasswordHasher',
+            'users.hashers.PBKDF2PasswordHasher',
+        ]
+        with self.settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('argon2$'))
+            self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(PASSWORD_HASHERS=PBKDF2_ONLY)
+    def test_failed_login_keeps_hash(self):
+        password = self.user.password
+        params = {**FAST_PARAMS, 'pbkdf2_sha256': {'iterations': 2000}}
+        with self.settings(PASSWORD_HASHER_PARAMS=params):
+            response = self.client.post(
+                reverse('token-obtain-pair'),
+                {'email': 'test@example.com', 'password': 'wrong'},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+
+class CalibratePasswordHashersCommandTests(TestCase):
+    def test_recommends_parameters(self):
+        out = StringIO()
+
+        call_command(
+            'calibrate_password_hashers',
+            target_ms=1,
+            rounds=1,
+            algorithm=['pbkdf2_sha256', 'scrypt'],
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        output = out.getvalue()
+        self.assertIn('PASSWORD_PBKDF2_ITERATIONS=', output)
+        self.assertIn('PASSWORD_SCRYPT_WORK_FACTOR=16384', output)
+        self.assertNotIn('ARGON2', output)
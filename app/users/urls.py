@@ -1,9 +1,12 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenRefreshView,
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
     TokenObtainPairView,
+    UserRegistrationView,
+    me,
+    me_async,
+    UserUpdateView,
 )
-from .views import UserRegistrationView, me, UserUpdateView
 
 urlpatterns = [
     path(
@@ -20,5 +23,6 @@ urlpatterns = [
         "register/", UserRegistrationView.as_view(), name="user-registration"
     ),
     path("me/", me, name="user-me"),
+    path("me/async/", me_async, name="user-me-async"),
     path("update/", UserUpdateView.as_view(), name="user-update"),
 ]
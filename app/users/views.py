@@ -1,5 +1,8 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from rest_framework import generics
 from rest_framework import status
+from .authentication import async_jwt_required
 from .models import User
 from .serializers import UserSerializer
 from rest_framework.decorators import (
@@ -8,11 +11,22 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
+
+from common.throttling import IPTokenBucketThrottle
+
+
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    # Every attempt hashes a password; cap them per client IP.
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = "token"
 
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = "register"
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -30,7 +44,8 @@ class UserUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user may come from the auth cache; write on a fresh row.
+        return User.objects.get(pk=self.request.user.pk)
 
     def put(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
@@ -50,3 +65,13 @@ def me(request):
     if request.user.is_authenticated:
         email = request.user.email
     return Response({"email": email})
+
+
+@require_GET
+@async_jwt_required
+async def me_async(request):
+    """
+    Async variant of ``me`` for ASGI workers
+    Returns user's email
+    """
+    return JsonResponse({"email": request.user.email})